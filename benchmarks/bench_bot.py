@@ -0,0 +1,220 @@
+"""Нагрузочный бенчмарк движка опроса на локальных заглушках.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_bot --tenants 1000 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import resource
+import time
+import urllib.request
+
+from benchmarks.stubs import serve
+from botapi import Bot
+from engine import Engine, Tenant, shard_of
+import homework
+from scheduler import Scheduler
+from sender import Sender
+import transport
+
+API_PATH = '/api/user_api/homework_statuses/'
+BOT_TOKEN = '123456:benchmark'
+
+
+def percentile(values, share):
+    """Возвращает перцентиль отсортированного списка."""
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+def rss_mb():
+    """Возвращает пиковый RSS процесса или воркера в мегабайтах."""
+    return max(resource.getrusage(who).ru_maxrss for who in
+               (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)) / 1024
+
+
+def start_stubs(practicum_options, telegram_options):
+    """Запускает заглушки в отдельном процессе и возвращает его и порт."""
+    ports = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=serve, args=(ports, practicum_options, telegram_options),
+        daemon=True
+    )
+    process.start()
+    return process, ports.get(timeout=10)
+
+
+def timed_fetch(timings):
+    """Возвращает fetch_api_answer, записывающий длительность опросов."""
+    def fetch(url, current_timestamp, headers):
+        started = time.perf_counter()
+        try:
+            return homework.fetch_api_answer(url, current_timestamp, headers)
+        finally:
+            timings.append(time.perf_counter() - started)
+    return fetch
+
+
+def make_engine(port, interval, concurrency, telegram_rate, timings=None,
+                hedge=False):
+    """Создаёт движок, направленный на заглушки.
+
+    С hedge медленные запросы к API дублируются.
+    """
+    transport.HEDGER = transport.Hedger() if hedge else None
+    bot = Bot(BOT_TOKEN, base_url=f'http://127.0.0.1:{port}/bot')
+    return Engine(
+        None,
+        url=f'http://127.0.0.1:{port}{API_PATH}',
+        concurrency=concurrency,
+        scheduler=Scheduler(intervals={}, idle=interval,
+                            backoff_base=interval, backoff_max=interval * 4),
+        sender=Sender(bot, global_rate=telegram_rate),
+        fetch=None if timings is None else timed_fetch(timings),
+    )
+
+
+def make_tenants(count, shard=0, shards=1):
+    """Создаёт студентов бенчмарка, попавших в шард."""
+    tenants = (Tenant(f'tenant{number}', str(number), current_date=1)
+               for number in range(count))
+    return [tenant for tenant in tenants
+            if shard_of(tenant.id, shards) == shard]
+
+
+async def drive(engine, tenants, interval, duration):
+    """Прогоняет движок заданное время."""
+    for number, tenant in enumerate(tenants):
+        engine.add_tenant(tenant, delay=number * interval / len(tenants))
+    task = asyncio.create_task(engine.run())
+    await asyncio.sleep(duration)
+    engine.stop()
+    await task
+
+
+def drive_shard(port, shard, workers, tenants, interval, duration,
+                concurrency, telegram_rate, hedge):
+    """Процесс-воркер бенчмарка: прогоняет движок на своём шарде."""
+    engine = make_engine(port, interval, concurrency, telegram_rate / workers,
+                         hedge=hedge)
+    asyncio.run(drive(
+        engine, make_tenants(tenants, shard, workers), interval, duration
+    ))
+
+
+def drive_workers(port, workers, *args):
+    """Прогоняет движок в нескольких процессах, по шарду на каждый."""
+    context = multiprocessing.get_context('spawn')
+    processes = [
+        context.Process(target=drive_shard, args=(port, shard, workers, *args))
+        for shard in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def cpu_seconds():
+    """Возвращает процессорное время процесса и завершённых потомков."""
+    usage = [resource.getrusage(who) for who in
+             (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    return sum(item.ru_utime + item.ru_stime for item in usage)
+
+
+def run(tenants=100, duration=10.0, interval=1.0, concurrency=64, workers=1,
+        api_latency=0.02, api_error_rate=0.0, homeworks=1,
+        comment_size=100, change_interval=5.0, telegram_latency=0.02,
+        telegram_error_rate=0.0, telegram_rate=30, api_tail_rate=0.0,
+        api_tail_latency=1.0, hedge=False):
+    """Запускает бенчмарк и возвращает отчёт.
+
+    Длительность опросов (poll_*) измеряется только с одним воркером.
+    """
+    process, port = start_stubs(
+        dict(latency=api_latency, error_rate=api_error_rate,
+             homeworks=homeworks, change_interval=change_interval,
+             comment_size=comment_size, tail_rate=api_tail_rate,
+             tail_latency=api_tail_latency),
+        dict(latency=telegram_latency, error_rate=telegram_error_rate),
+    )
+    timings = []
+    try:
+        started = time.perf_counter()
+        cpu_started = cpu_seconds()
+        if workers == 1:
+            engine = make_engine(port, interval, concurrency, telegram_rate,
+                                 timings, hedge)
+            asyncio.run(drive(
+                engine, make_tenants(tenants), interval, duration
+            ))
+        else:
+            drive_workers(port, workers, tenants, interval, duration,
+                          concurrency, telegram_rate, hedge)
+        elapsed = time.perf_counter() - started
+        cpu = cpu_seconds() - cpu_started
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/stats') as page:
+            stats = json.load(page)
+    finally:
+        process.terminate()
+    latencies = sorted(stats.pop('latencies'))
+    timings.sort()
+    return dict(
+        stats,
+        tenants=tenants,
+        workers=workers,
+        elapsed=round(elapsed, 3),
+        polls_per_second=round(stats['api_requests'] / duration, 1),
+        cpu_share=round(cpu / elapsed, 3),
+        notified=len(latencies),
+        latency_p50=round(percentile(latencies, 0.5), 3),
+        latency_p95=round(percentile(latencies, 0.95), 3),
+        latency_p99=round(percentile(latencies, 0.99), 3),
+        poll_p50=round(percentile(timings, 0.5), 3),
+        poll_p99=round(percentile(timings, 0.99), 3),
+        poll_max=round(timings[-1], 3) if timings else float('nan'),
+        rss_mb=round(rss_mb(), 1),
+    )
+
+
+def main():
+    """Разбирает аргументы и печатает отчёт."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='интервал опроса студента, с')
+    parser.add_argument('--concurrency', type=int, default=64,
+                        help='одновременных запросов на воркер')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='процессов-воркеров с шардами студентов')
+    parser.add_argument('--api-latency', type=float, default=0.02)
+    parser.add_argument('--api-error-rate', type=float, default=0.0)
+    parser.add_argument('--api-tail-rate', type=float, default=0.0,
+                        help='доля медленных ответов API')
+    parser.add_argument('--api-tail-latency', type=float, default=1.0,
+                        help='задержка медленного ответа API, с')
+    parser.add_argument('--hedge', action='store_true',
+                        help='дублировать медленные запросы к API')
+    parser.add_argument('--homeworks', type=int, default=1,
+                        help='работ в каждом ответе API')
+    parser.add_argument('--comment-size', type=int, default=100,
+                        help='длина комментария ревьюера, символов')
+    parser.add_argument('--change-interval', type=float, default=5.0,
+                        help='как часто у студента меняется статус, с')
+    parser.add_argument('--telegram-latency', type=float, default=0.02)
+    parser.add_argument('--telegram-error-rate', type=float, default=0.0,
+                        help='доля ответов 429 от Bot API')
+    parser.add_argument('--telegram-rate', type=float, default=30)
+    args = parser.parse_args()
+    report = run(**vars(args))
+    for key, value in report.items():
+        print(f'{key:>20}: {value}')
+
+
+if __name__ == '__main__':
+    main()
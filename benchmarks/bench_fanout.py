@@ -0,0 +1,87 @@
+"""Рассылка одного вердикта многим чатам.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_fanout --recipients 50 --workers 1 8
+"""
+import argparse
+import threading
+import time
+
+from engine import Tenant
+from sender import Sender
+from subscriptions import Subscriptions
+
+HOMEWORK = {'id': 1, 'homework_name': 'hw', 'status': 'approved'}
+
+
+class LatencyBot:
+    """Бот, каждый вызов которого занимает latency секунд."""
+
+    def __init__(self, latency):
+        """Создаёт бота с задержкой latency."""
+        self.latency = latency
+        self.sent = 0
+        self._lock = threading.Lock()
+
+    def send_message(self, chat_id, text):
+        """Ждёт latency и считает сообщение."""
+        time.sleep(self.latency)
+        with self._lock:
+            self.sent += 1
+
+
+def make_index(tenants, recipients):
+    """Возвращает индекс: у каждого студента recipients подписчиков."""
+    subscriptions = Subscriptions()
+    for tenant in range(tenants):
+        for number in range(recipients):
+            subscriptions.add(f'{tenant}-{number}', tenant=str(tenant))
+    return subscriptions
+
+
+def lookup_us(subscriptions, tenants, repeat=10_000):
+    """Возвращает среднее время поиска получателей в микросекундах."""
+    population = [Tenant('token', str(number)) for number in range(tenants)]
+    started = time.perf_counter()
+    for number in range(repeat):
+        subscriptions.recipients(population[number % tenants], HOMEWORK)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def deliver(recipients, workers, latency, rate=1000):
+    """Рассылает вердикт recipients чатам и возвращает время в секундах."""
+    bot = LatencyBot(latency)
+    sender = Sender(bot, global_rate=rate, workers=workers)
+    sender.submit_many(
+        [(str(chat), 'вердикт', None) for chat in range(recipients)]
+    )
+    started = time.perf_counter()
+    sender.start()
+    sender.stop()
+    assert bot.sent == recipients
+    return time.perf_counter() - started
+
+
+def main():
+    """Разбирает аргументы и печатает отчёт."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--recipients', type=int, default=50)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='задержка одного вызова Bot API, с')
+    parser.add_argument('--tenants', type=int, default=10_000,
+                        help='студентов в индексе подписок')
+    args = parser.parse_args()
+    for tenants in (10, args.tenants):
+        subscriptions = make_index(tenants, 3)
+        print(f'{f"lookup, {tenants} tenants":>24}: '
+              f'{lookup_us(subscriptions, tenants):.2f} мкс')
+    for workers in args.workers:
+        elapsed = deliver(args.recipients, workers, args.latency)
+        print(f'{f"{workers} workers":>24}: {elapsed:.2f} с на '
+              f'{args.recipients} чатов')
+
+
+if __name__ == '__main__':
+    main()
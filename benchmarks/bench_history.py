@@ -0,0 +1,89 @@
+"""Время отчёта /stats по журналу смен статусов.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_history --events 5000000
+"""
+import argparse
+import random
+import tempfile
+import time
+
+from history import History, tenant_key
+import homework
+
+CHUNK = 100_000
+HOUR = 3600
+
+
+def synthesize(history, events=1_000_000, tenants=10_000, seed=0,
+               start=1_700_000_000):
+    """Пишет в history не меньше events смен статусов.
+
+    Работа уходит на проверку, возвращается с долей возвратов около 30%
+    и после доработки снова уходит на проверку, пока её не примут.
+    """
+    rand = random.Random(seed)
+    codes = homework.STATUS_CODES
+    columns = ([], [], [], [])
+    written = 0
+    homework_id = 0
+    while written < events:
+        tenant = tenant_key(rand.randrange(tenants))
+        homework_id += 1
+        at = start + rand.uniform(0, 90 * 24 * HOUR)
+        while True:
+            at += rand.expovariate(1 / (2 * HOUR))
+            verdict = 'rejected' if rand.random() < 0.3 else 'approved'
+            for status, moment in (
+                ('reviewing', at),
+                (verdict, at + rand.expovariate(1 / (20 * HOUR))),
+            ):
+                for column, value in zip(
+                    columns, (tenant, homework_id, codes[status], moment)
+                ):
+                    column.append(value)
+            at = columns[3][-1]
+            if verdict == 'approved':
+                break
+        if len(columns[0]) >= CHUNK:
+            written += len(columns[0])
+            history.write(*columns)
+            columns = ([], [], [], [])
+    history.write(*columns)
+    history.close()
+    return written + len(columns[0])
+
+
+def measure(history, repeat=3, tenant_id=None):
+    """Возвращает отчёт и лучшее время его построения в секундах."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        report = history.report(tenant_id)
+        best = min(best, time.perf_counter() - started)
+    return report, best
+
+
+def main():
+    """Разбирает аргументы и печатает отчёт."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=1_000_000)
+    parser.add_argument('--tenants', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        history = History(directory)
+        started = time.perf_counter()
+        events = synthesize(history, args.events, args.tenants)
+        print(f'{"events":>20}: {events} '
+              f'(запись {time.perf_counter() - started:.1f} с)')
+        for title, tenant_id in (('all', None), ('one tenant', 0)):
+            report, elapsed = measure(history, args.repeat, tenant_id)
+            print(f'{title:>20}: {elapsed * 1000:.0f} мс')
+            for key, value in report.items():
+                print(f'{key:>20}: {value}')
+
+
+if __name__ == '__main__':
+    main()
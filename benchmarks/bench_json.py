@@ -0,0 +1,124 @@
+"""Разбор ответов API разными декодерами JSON, со сжатием и без.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_json --homeworks 1 20 200
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+import zlib
+
+import requests
+
+import codec
+import transport
+
+LESSONS = ('Итоговый проект', 'Спринт 5: API для Yatube',
+           'Бот-ассистент', 'Модели и миграции Django')
+PHRASES = ('Отличная работа!', 'Посмотри замечания в коде.',
+           'Нужно вынести константы в начало модуля.',
+           'Не забудь про обработку исключений при запросе к API.',
+           'Тесты проходят, но docstring стоит дописать.')
+STATUSES = ('approved', 'reviewing', 'rejected')
+
+
+def payload(homeworks=20, seed=0):
+    """Возвращает тело ответа API с homeworks работами в UTF-8."""
+    rand = random.Random(seed)
+    data = {
+        'homeworks': [
+            {
+                'id': 120_000 + number,
+                'status': rand.choice(STATUSES),
+                'homework_name': f'student__hw{number:02d}_final.zip',
+                'reviewer_comment': ' '.join(
+                    rand.choice(PHRASES) for _ in range(rand.randint(1, 6))
+                ),
+                'date_updated': '2022-0{month}-{day:02d}T14:40:57Z'.format(
+                    month=rand.randint(1, 9), day=rand.randint(1, 28)
+                ),
+                'lesson_name': rand.choice(LESSONS),
+            }
+            for number in range(homeworks)
+        ],
+        'current_date': 1_700_000_000,
+    }
+    return json.dumps(data, ensure_ascii=False).encode()
+
+
+def timeit(func, body, repeat):
+    """Возвращает лучшее среднее время вызова func(body) в микросекундах."""
+    number = max(1, 200_000 // max(len(body), 1))
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func(body)
+        best = min(best, (time.perf_counter() - started) / number)
+    return best * 1e6
+
+
+def gunzip(body):
+    """Распаковывает gzip так же, как urllib3 для Content-Encoding."""
+    return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(body)
+
+
+def make_response(body):
+    """Возвращает ответ requests с телом body."""
+    response = requests.Response()
+    response._content = body
+    response.status_code = 200
+    return response
+
+
+def measure(homeworks=20, repeat=5):
+    """Возвращает размеры тела и время разбора каждым декодером.
+
+    requests_us - Response.json, transport_us - ответ сессии transport;
+    время со сжатием включает распаковку gzip.
+    """
+    body = payload(homeworks)
+    compressed = gzip.compress(body, compresslevel=1)
+    report = {
+        'bytes': len(body),
+        'gzip_bytes': len(compressed),
+        'gunzip_us': round(timeit(gunzip, compressed, repeat), 1),
+    }
+    response = make_response(body)
+    report['requests_us'] = round(
+        timeit(lambda _: response.json(), body, repeat), 1
+    )
+    transport.use_codec(response)
+    report['transport_us'] = round(
+        timeit(lambda _: response.json(), body, repeat), 1
+    )
+    expected = json.loads(body)
+    for name in codec.available():
+        loads = codec.decoder(name)[1]
+        assert loads(body) == expected, name
+        report[f'{name}_us'] = round(timeit(loads, body, repeat), 1)
+        report[f'{name}_gzip_us'] = round(timeit(
+            lambda data: loads(gunzip(data)), compressed, repeat
+        ), 1)
+    return report
+
+
+def main():
+    """Разбирает аргументы и печатает отчёт."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--homeworks', type=int, nargs='+',
+                        default=[1, 20, 200],
+                        help='число работ в ответе')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    for homeworks in args.homeworks:
+        print(f'{homeworks} работ:')
+        for key, value in measure(homeworks, args.repeat).items():
+            print(f'{key:>20}: {value}')
+
+
+if __name__ == '__main__':
+    main()
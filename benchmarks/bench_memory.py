@@ -0,0 +1,68 @@
+"""Память на одного студента в движке опроса.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_memory --tenants 100000
+"""
+import argparse
+import gc
+import tracemalloc
+
+from engine import Engine, Tenant
+from scheduler import Scheduler
+
+TOKEN_LENGTH = 58
+
+
+def make_tenant(number):
+    """Создаёт студента с токеном и чатом реалистичной длины."""
+    return Tenant(
+        token=f'y0_{number:0{TOKEN_LENGTH - 3}d}',
+        chat_id=str(1_000_000_000 + number),
+        current_date=1_700_000_000 + number,
+    )
+
+
+def remember_history(tenants, homeworks):
+    """Запоминает каждому студенту статусы homeworks работ."""
+    for tenant in tenants:
+        for number in range(homeworks):
+            tenant.index.remember({
+                'id': 100_000 + number, 'homework_name': f'hw{number}',
+                'status': 'approved',
+            })
+        tenant.status = 'approved'
+
+
+def measure(tenants=10_000, homeworks=0):
+    """Возвращает байты на студента, добавленного в движок."""
+    engine = Engine(None, scheduler=Scheduler())
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    population = [make_tenant(number) for number in range(tenants)]
+    remember_history(population, homeworks)
+    engine.sync_tenants(population)
+    del population
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / tenants
+
+
+def main():
+    """Разбирает аргументы и печатает отчёт."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=100_000)
+    parser.add_argument('--homeworks', type=int, default=3,
+                        help='работ в истории активного студента')
+    args = parser.parse_args()
+    idle = measure(args.tenants)
+    active = measure(args.tenants, args.homeworks)
+    print(f'{"idle":>20}: {idle:.0f} байт на студента')
+    print(f'{"with history":>20}: {active:.0f} байт на студента '
+          f'({args.homeworks} работ)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Воспроизведение трассы ответов API в виртуальном времени.
+
+Трасса пишется ботом при заданном RECORD_TRACE или генерируется:
+
+    python -m benchmarks.bench_replay --generate 1000 --days 7 --profile
+    python -m benchmarks.bench_replay trace.jsonl --interval reviewing=120
+"""
+import argparse
+import cProfile
+import pstats
+import random
+import time
+
+from benchmarks.bench_bot import percentile
+import homework
+from replay import Trace, replay
+from scheduler import Scheduler
+
+DAY = 24 * 3600
+POLL_INTERVAL = 600
+STATUS_FLOW = ('reviewing', 'rejected', 'reviewing', 'approved')
+
+
+def synthesize(tenants=100, days=7.0, seed=0, start=1_700_000_000):
+    """Генерирует записи трассы: каждый студент сдаёт работы по кругу.
+
+    Статусы меняются в среднем раз в сутки, опросы идут раз в
+    POLL_INTERVAL секунд.
+    """
+    rand = random.Random(seed)
+    end = start + days * DAY
+    records = []
+    for number in range(tenants):
+        tenant = f'{number:08x}'
+        changes = []
+        at = start + rand.uniform(0, DAY)
+        step = 0
+        while at < end:
+            homework_id = step // len(STATUS_FLOW)
+            changes.append((at, {
+                'id': homework_id,
+                'homework_name': f'hw{homework_id}',
+                'status': STATUS_FLOW[step % len(STATUS_FLOW)],
+            }))
+            at += rand.expovariate(1 / DAY)
+            step += 1
+        polled = start
+        position = 0
+        while polled < end:
+            polled += POLL_INTERVAL
+            fresh = []
+            while position < len(changes) and changes[position][0] <= polled:
+                fresh.append(changes[position][1])
+                position += 1
+            records.append({
+                'at': polled, 'tenant': tenant, 'from': int(polled),
+                'homeworks': fresh[::-1], 'current_date': int(polled),
+            })
+    return records
+
+
+def run(trace, intervals=None, idle=None, seed=0, profile=None):
+    """Воспроизводит трассу и возвращает отчёт."""
+    options = {} if idle is None else {'idle': idle}
+    scheduler = Scheduler(
+        intervals=intervals, rand=random.Random(seed).random, **options
+    )
+    profiler = cProfile.Profile() if profile else None
+    started = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    result = replay(trace, scheduler=scheduler)
+    if profiler is not None:
+        profiler.disable()
+    elapsed = time.perf_counter() - started
+    if profiler is not None:
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(profile)
+    latencies = result.pop('latencies')
+    return dict(
+        result,
+        elapsed=round(elapsed, 3),
+        speedup=round(result['simulated_seconds'] / max(elapsed, 1e-9)),
+        latency_p50=round(percentile(latencies, 0.5), 1),
+        latency_p95=round(percentile(latencies, 0.95), 1),
+        latency_max=round(latencies[-1], 1) if latencies else float('nan'),
+    )
+
+
+def parse_interval(value):
+    """Разбирает аргумент вида status=seconds."""
+    status, _, seconds = value.partition('=')
+    if status not in homework.HOMEWORK_VERDICTS:
+        raise argparse.ArgumentTypeError(
+            homework.UNKNOWN_STATUS.format(status=status)
+        )
+    return status, float(seconds)
+
+
+def main():
+    """Разбирает аргументы и печатает отчёт."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('trace', nargs='?', help='файл трассы JSON Lines')
+    parser.add_argument('--generate', type=int, metavar='TENANTS',
+                        help='сгенерировать трассу на TENANTS студентов')
+    parser.add_argument('--days', type=float, default=7.0)
+    parser.add_argument('--interval', type=parse_interval, action='append',
+                        default=[], help='интервал опроса status=seconds')
+    parser.add_argument('--idle', type=float,
+                        help='интервал опроса без активных работ, с')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--profile', type=int, nargs='?', const=25,
+                        metavar='LINES',
+                        help='профилировать cProfile и показать LINES строк')
+    args = parser.parse_args()
+    if args.generate:
+        trace = Trace(synthesize(args.generate, args.days, args.seed))
+    elif args.trace:
+        trace = Trace.load(args.trace)
+    else:
+        parser.error('нужен файл трассы или --generate')
+    report = run(trace, dict(args.interval) or None, args.idle, args.seed,
+                 args.profile)
+    for key, value in report.items():
+        print(f'{key:>20}: {value}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Время холодного старта и память на импорт модулей бота.
+
+Каждый замер идёт в свежем интерпретаторе. Запуск из корня репозитория:
+
+    python -m benchmarks.bench_startup --repeat 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGETS = {
+    'homework': ['homework'],
+    'homework+telegram': ['homework', 'telegram'],
+    'telegram': ['telegram'],
+}
+PROBE = '''
+import json, resource, sys, time
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+started = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+elapsed = time.perf_counter() - started
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({'seconds': elapsed, 'rss_kb': after - before}))
+'''
+
+
+def measure(modules):
+    """Импортирует модули в свежем интерпретаторе и возвращает замер."""
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, *modules],
+        cwd=ROOT, capture_output=True, check=True, text=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def run(repeat=5, targets=TARGETS):
+    """Возвращает медианы времени импорта и прироста RSS по целям."""
+    report = {}
+    for target, modules in targets.items():
+        samples = [measure(modules) for _ in range(repeat)]
+        report[target] = dict(
+            import_ms=round(1000 * statistics.median(
+                sample['seconds'] for sample in samples
+            ), 1),
+            rss_mb=round(statistics.median(
+                sample['rss_kb'] for sample in samples
+            ) / 1024, 1),
+        )
+    return report
+
+
+def main():
+    """Разбирает аргументы и печатает отчёт."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    for target, result in run(args.repeat).items():
+        print(f'{target:>20}: {result["import_ms"]:>7} мс, '
+              f'{result["rss_mb"]:>5} МБ')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+import gzip
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+STATUSES = ('reviewing', 'rejected', 'reviewing', 'approved')
+GZIP_MIN_LENGTH = 256
+NAME_PATTERN = re.compile(r'"([^"]+)"')
+
+
+class PracticumStub:
+    """Студенты, чьи работы меняют статус через заданные промежутки."""
+
+    def __init__(self, latency=0.0, error_rate=0.0, homeworks=1,
+                 change_interval=5.0, comment_size=100, tail_rate=0.0,
+                 tail_latency=1.0):
+        """Создаёт заглушку с настройками задержки, ошибок и размера ответа.
+
+        Доля tail_rate ответов задерживается на tail_latency секунд.
+        """
+        self.latency = latency
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.error_rate = error_rate
+        self.homeworks = homeworks
+        self.change_interval = change_interval
+        self.comment = 'x' * comment_size
+        self.requests = 0
+        self.errors = 0
+        self.published = {}
+        self._students = {}
+        self._lock = threading.Lock()
+
+    def _student(self, token, now):
+        if token not in self._students:
+            self._students[token] = {
+                'homeworks': [
+                    {'id': number, 'homework_name': f'{token}-{number}',
+                     'status': 'approved', 'reviewer_comment': self.comment,
+                     'date_updated': 0}
+                    for number in range(self.homeworks)
+                ],
+                'changes': 0,
+                'next_change': now + random.uniform(0, self.change_interval),
+            }
+        return self._students[token]
+
+    def answer(self, token):
+        """Возвращает код ответа и тело для запроса студента."""
+        time.sleep(self.tail_latency if random.random() < self.tail_rate
+                   else self.latency)
+        now = time.time()
+        with self._lock:
+            self.requests += 1
+            if random.random() < self.error_rate:
+                self.errors += 1
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': 'stub'}
+            student = self._student(token, now)
+            while student['next_change'] <= now:
+                changed = student['homeworks'][0]
+                student['changes'] += 1
+                changed['status'] = STATUSES[
+                    student['changes'] % len(STATUSES)
+                ]
+                changed['date_updated'] = int(student['next_change'])
+                self.published[changed['homework_name']] = (
+                    changed['status'], student['next_change']
+                )
+                student['next_change'] += self.change_interval
+            homeworks = [dict(homework) for homework in student['homeworks']]
+        return HTTPStatus.OK, {'homeworks': homeworks, 'current_date': now}
+
+
+class TelegramStub:
+    """Принимает sendMessage и считает задержку доставки уведомлений."""
+
+    def __init__(self, practicum, latency=0.0, error_rate=0.0):
+        """Создаёт заглушку, сверяющую сообщения с заглушкой Практикума."""
+        self.practicum = practicum
+        self.latency = latency
+        self.error_rate = error_rate
+        self.messages = 0
+        self.throttled = 0
+        self.latencies = []
+        self._delivered = set()
+        self._lock = threading.Lock()
+
+    def send_message(self, text):
+        """Возвращает код ответа и тело для вызова sendMessage."""
+        time.sleep(self.latency)
+        now = time.time()
+        with self._lock:
+            if random.random() < self.error_rate:
+                self.throttled += 1
+                return HTTPStatus.TOO_MANY_REQUESTS, {
+                    'ok': False, 'error_code': 429,
+                    'description': 'Too Many Requests: retry after 1',
+                    'parameters': {'retry_after': 1},
+                }
+            self.messages += 1
+            for name in NAME_PATTERN.findall(text):
+                published = self.practicum.published.get(name)
+                if published is None or (name, published) in self._delivered:
+                    continue
+                self._delivered.add((name, published))
+                self.latencies.append(now - published[1])
+        return HTTPStatus.OK, {'ok': True, 'result': {
+            'message_id': self.messages, 'date': int(now), 'text': text,
+            'chat': {'id': 1, 'type': 'private'},
+        }}
+
+    def stats(self):
+        """Возвращает счётчики обеих заглушек."""
+        with self._lock:
+            return {
+                'api_requests': self.practicum.requests,
+                'api_errors': self.practicum.errors,
+                'published': len(self.practicum.published),
+                'messages': self.messages,
+                'throttled': self.throttled,
+                'latencies': list(self.latencies),
+            }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Отвечает на запросы от имени одной из заглушек.
+
+    Ответы от GZIP_MIN_LENGTH байт сжимаются, если клиент принимает gzip.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        """Не пишет лог запросов."""
+
+    def _reply(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        accepted = self.headers.get('Accept-Encoding', '')
+        if len(body) >= GZIP_MIN_LENGTH and 'gzip' in accepted:
+            body = gzip.compress(body, compresslevel=1)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        """Обслуживает опрос статусов и страницу статистики."""
+        url = urlparse(self.path)
+        if url.path == '/stats':
+            return self._reply(HTTPStatus.OK, self.server.telegram.stats())
+        token = self.headers.get('Authorization', '').partition(' ')[2]
+        self._reply(*self.server.practicum.answer(token))
+
+    def do_POST(self):
+        """Обслуживает вызовы Bot API."""
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            text = json.loads(body).get('text', '')
+        else:
+            text = parse_qs(body.decode()).get('text', [''])[0]
+        self._reply(*self.server.telegram.send_message(text))
+
+
+def serve(ports, practicum_options, telegram_options):
+    """Запускает заглушки на одном порту и кладёт его в очередь ports."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.practicum = PracticumStub(**practicum_options)
+    server.telegram = TelegramStub(server.practicum, **telegram_options)
+    ports.put(server.server_address[1])
+    server.serve_forever()
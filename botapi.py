@@ -0,0 +1,66 @@
+import transport
+
+BOT_API_URL = 'https://api.telegram.org/bot'
+
+BOT_API_ERROR = 'Bot API вернул ошибку {code}: {description}'
+BAD_BOT_RESPONSE = 'Bot API вернул не JSON, статус {code}'
+
+
+class BotError(Exception):
+    """Ошибка Bot API; retry_after задан, если Telegram просит подождать."""
+
+    def __init__(self, message, code=None, retry_after=None):
+        """Создаёт ошибку с кодом ответа и паузой до повтора."""
+        super().__init__(message)
+        self.code = code
+        self.retry_after = retry_after
+
+
+class Bot:
+    """Минимальный клиент Bot API для отправки сообщений.
+
+    Работает через общую сессию transport, не загружая python-telegram-bot.
+    """
+
+    def __init__(self, token, base_url=BOT_API_URL, session=None,
+                 timeout=None, breaker=None):
+        """Создаёт клиент бота с токеном token.
+
+        Без timeout таймауты берутся из бюджета потока (transport); тело
+        ответа в любом случае читается не дольше этого бюджета.
+        """
+        self.url = f'{base_url}{token}/'
+        self.session = transport.SESSION if session is None else session
+        self.timeout = timeout
+        self.breaker = (
+            transport.BREAKERS.get(base_url) if breaker is None else breaker
+        )
+
+    def _call(self, method, **params):
+        response = self.breaker.call(
+            transport.guarded, self.session.post, self.url + method,
+            json=params,
+            timeout=transport.timeout() if self.timeout is None
+            else self.timeout
+        )
+        try:
+            data = response.json()
+        except ValueError:
+            raise BotError(
+                BAD_BOT_RESPONSE.format(code=response.status_code),
+                code=response.status_code
+            )
+        if not data.get('ok'):
+            raise BotError(
+                BOT_API_ERROR.format(
+                    code=data.get('error_code'),
+                    description=data.get('description')
+                ),
+                code=data.get('error_code'),
+                retry_after=data.get('parameters', {}).get('retry_after')
+            )
+        return data['result']
+
+    def send_message(self, chat_id, text):
+        """Отправляет текстовое сообщение в чат."""
+        return self._call('sendMessage', chat_id=chat_id, text=text)
@@ -0,0 +1,138 @@
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+import metrics
+
+FAILURE_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', 5))
+RESET_TIMEOUT = float(os.getenv('BREAKER_RESET_TIMEOUT', 30))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+CIRCUIT_OPEN = 'Сервер {name} недоступен, запрос не отправлялся'
+CIRCUIT_OPENED = 'Сервер {name} не отвечает: {failures} сбоев подряд'
+CIRCUIT_CLOSED = 'Сервер {name} снова отвечает'
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Запрос отклонён без обращения к сети: предохранитель разомкнут.
+
+    retry_after - секунды до пробного запроса; очередь отправки
+    откладывает сообщения на это время, не тратя попытки.
+    """
+
+    def __init__(self, message, retry_after):
+        """Создаёт ошибку с паузой до пробного запроса."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Предохранитель одного сервера, общий для всех студентов.
+
+    После failure_threshold сбоев подряд запросы отклоняются сразу;
+    через reset_timeout пропускается один пробный запрос, и по его
+    результату предохранитель замыкается или снова размыкается.
+    """
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD,
+                 reset_timeout=RESET_TIMEOUT, clock=time.monotonic):
+        """Создаёт замкнутый предохранитель."""
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Проверяет, можно ли отправить запрос.
+
+        Пробный запрос, не вернувшийся за reset_timeout, считается
+        потерянным, и пропускается следующий.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = self.clock()
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            self.state = HALF_OPEN
+            self.opened_at = now
+            return True
+
+    def retry_after(self):
+        """Возвращает время до следующего пробного запроса."""
+        with self._lock:
+            if self.state == CLOSED:
+                return 0
+            return max(0, self.opened_at + self.reset_timeout - self.clock())
+
+    def success(self):
+        """Отмечает ответ сервера."""
+        with self._lock:
+            if self.state != CLOSED:
+                logging.info(CIRCUIT_CLOSED.format(name=self.name))
+            self.state = CLOSED
+            self.failures = 0
+
+    def failure(self):
+        """Отмечает сбой сервера."""
+        with self._lock:
+            self.failures += 1
+            if self.state == OPEN:
+                return
+            if (self.state == HALF_OPEN
+                    or self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = self.clock()
+                logging.error(CIRCUIT_OPENED.format(
+                    name=self.name, failures=self.failures
+                ))
+
+    def call(self, request, *args, **kwargs):
+        """Выполняет запрос request, если сервер считается доступным.
+
+        Сбоем считаются сетевые ошибки и ответы 5xx.
+        """
+        if not self.allow():
+            metrics.ERRORS.inc('circuit_open')
+            raise CircuitOpenError(
+                CIRCUIT_OPEN.format(name=self.name), self.retry_after()
+            )
+        try:
+            response = request(*args, **kwargs)
+        except requests.exceptions.RequestException:
+            self.failure()
+            raise
+        if response.status_code >= 500:
+            self.failure()
+        else:
+            self.success()
+        return response
+
+
+class Breakers:
+    """Предохранители по хостам: один на каждый внешний сервер."""
+
+    def __init__(self, **options):
+        """Создаёт пустой реестр; options передаются предохранителям."""
+        self.options = options
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """Возвращает предохранитель хоста из url."""
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(host, **self.options)
+            return self._breakers[host]
@@ -0,0 +1,45 @@
+import importlib
+import importlib.util
+import os
+
+JSON_DECODER = os.getenv('JSON_DECODER')
+DECODERS = ('orjson', 'ujson', 'json')
+
+UNKNOWN_DECODER = 'Декодер JSON {name} недоступен, есть: {available}'
+
+NAME = None
+_loads = None
+
+
+def available():
+    """Возвращает установленные декодеры JSON, от быстрого к медленному."""
+    return [
+        name for name in DECODERS if importlib.util.find_spec(name)
+    ]
+
+
+def decoder(name=None):
+    """Возвращает имя и функцию loads декодера JSON.
+
+    Без name берётся самый быстрый из установленных: orjson, ujson,
+    стандартный json. Все они принимают bytes и str.
+    """
+    installed = available()
+    if name is None:
+        name = installed[0]
+    if name not in installed:
+        raise ValueError(UNKNOWN_DECODER.format(
+            name=name, available=', '.join(installed)
+        ))
+    return name, importlib.import_module(name).loads
+
+
+def loads(body):
+    """Разбирает JSON из bytes или str.
+
+    Декодер импортируется при первом вызове, чтобы не замедлять запуск.
+    """
+    global NAME, _loads
+    if _loads is None:
+        NAME, _loads = decoder(JSON_DECODER)
+    return _loads(body)
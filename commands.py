@@ -0,0 +1,177 @@
+from concurrent.futures import Future
+import logging
+import math
+import os
+import threading
+import time
+
+import homework
+import transport
+
+CACHE_TTL = float(os.getenv('CACHE_TTL', 60))
+
+STATUS_REPLY = 'Статус работы "{name}": {verdict}'
+NO_HOMEWORKS = 'Работ пока нет.'
+UNKNOWN_CHAT = 'Этот чат не подписан на уведомления о работах.'
+COMMAND_ERROR = 'Не удалось выполнить команду {command}: {error}'
+COMMAND_FAILED = 'Не удалось получить статус работ, попробуйте позже.'
+STATS_REPLY = ('{title}: вердиктов {verdicts}, возвратов {reject_rate:.0%}, '
+               'срок проверки: медиана {turnaround_p50}, '
+               'p90 {turnaround_p90}, p99 {turnaround_p99}')
+STATS_TITLES = ('Ваши работы', 'Все студенты')
+NO_STATS = 'Статистика проверок пока не собрана.'
+HOUR = 3600
+
+
+class SingleFlight:
+    """Объединяет одновременные вызовы с одинаковым ключом в один."""
+
+    def __init__(self):
+        """Создаёт пустой реестр выполняющихся вызовов."""
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """Вызывает func или дожидается результата уже идущего вызова."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            return call.result()
+        try:
+            result = func()
+        except Exception as error:
+            call.set_exception(error)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class ResponseCache:
+    """История работ студентов с TTL; промах вызывает один запрос к API."""
+
+    def __init__(self, url=homework.ENDPOINT, ttl=CACHE_TTL,
+                 clock=time.monotonic):
+        """Создаёт пустой кэш."""
+        self.url = url
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = {}
+        self._flight = SingleFlight()
+
+    def _load(self, tenant):
+        response = homework.fetch_api_answer(self.url, 0, tenant.headers)
+        entry = self._entries.get(tenant.id)
+        if response is None and entry is None:
+            transport.CACHE.forget(
+                self.url, tenant.headers, {'from_date': 0}
+            )
+            response = homework.fetch_api_answer(self.url, 0, tenant.headers)
+        if response is None and entry is not None:
+            homeworks = entry[1]
+        else:
+            homeworks = homework.check_response(response)
+        self._entries[tenant.id] = (self.clock(), homeworks)
+        return homeworks
+
+    def get(self, tenant):
+        """Возвращает все работы студента, новые первыми."""
+        entry = self._entries.get(tenant.id)
+        if entry is not None and self.clock() - entry[0] < self.ttl:
+            return entry[1]
+        return self._flight.do(tenant.id, lambda: self._load(tenant))
+
+    def invalidate(self, tenant_id):
+        """Сбрасывает закэшированную историю студента."""
+        self._entries.pop(tenant_id, None)
+
+
+def render_status(homework_data):
+    """Возвращает строку со статусом одной работы."""
+    return STATUS_REPLY.format(
+        name=homework_data['homework_name'],
+        verdict=homework.HOMEWORK_VERDICTS[homework_data['status']]
+    )
+
+
+def format_duration(seconds):
+    """Возвращает срок в часах или прочерк, если срок неизвестен."""
+    if math.isnan(seconds):
+        return '-'
+    return f'{seconds / HOUR:.1f} ч'
+
+
+def render_stats(title, report):
+    """Возвращает строку отчёта History.report."""
+    return STATS_REPLY.format(title=title, **dict(report, **{
+        key: format_duration(value) for key, value in report.items()
+        if key.startswith('turnaround_')
+    }))
+
+
+class Commands:
+    """Отвечает на команды /status и /history из кэша ответов API.
+
+    Команда /stats строится по журналу смен статусов history.
+    """
+
+    def __init__(self, tenants, cache, history=None):
+        """Создаёт обработчик для студентов, найденных по id чата."""
+        self.tenants = {str(tenant.chat_id): tenant for tenant in tenants}
+        self.cache = cache
+        self.history = history
+
+    def stats(self, tenant):
+        """Возвращает статистику проверок студента и всех студентов."""
+        if self.history is None:
+            return NO_STATS
+        reports = [self.history.report(tenant.id), self.history.report()]
+        if not reports[1]['verdicts']:
+            return NO_STATS
+        return '\n'.join(
+            render_stats(title, report)
+            for title, report in zip(STATS_TITLES, reports)
+        )
+
+    def reply(self, command, chat_id):
+        """Возвращает текст ответа на команду из чата."""
+        tenant = self.tenants.get(str(chat_id))
+        if tenant is None:
+            return UNKNOWN_CHAT
+        if command == 'stats':
+            return self.stats(tenant)
+        try:
+            homeworks = self.cache.get(tenant)
+        except Exception as error:
+            logging.error(COMMAND_ERROR.format(command=command, error=error))
+            return COMMAND_FAILED
+        if not homeworks:
+            return NO_HOMEWORKS
+        if command == 'status':
+            return render_status(homeworks[0])
+        return '\n'.join(render_status(item) for item in homeworks)
+
+    def handle(self, update, context):
+        """Обработчик python-telegram-bot для всех команд."""
+        command = update.message.text.split()[0].lstrip('/').split('@')[0]
+        update.message.reply_text(
+            self.reply(command, update.effective_chat.id)
+        )
+
+    def start(self, token):
+        """Начинает принимать команды через long polling Bot API."""
+        from telegram.ext import CommandHandler, Updater
+
+        updater = Updater(token)
+        updater.dispatcher.add_handler(
+            CommandHandler(['status', 'history', 'stats'], self.handle,
+                           run_async=True)
+        )
+        updater.start_polling()
+        return updater
@@ -0,0 +1,559 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+import zlib
+
+from commands import Commands, ResponseCache
+from history import History
+import homework
+from leases import LEASES, REPLICA_ID, Leases
+from profiling import PROFILE, Profiler
+import replay
+from scheduler import Scheduler
+from sender import GLOBAL_RATE, Sender
+from storage import Store
+from subscriptions import SUBSCRIPTIONS_FILE, Subscriptions
+import transport
+
+TENANT_ERROR = 'Сбой опроса студента {tenant}: {error}'
+TENANTS_LOADED = 'Загружено студентов: {count}'
+TENANTS_CHANGED = ('Состав студентов изменился: '
+                   'добавлено {added}, удалено {removed}')
+RELOAD_ERROR = 'Не удалось перечитать файл студентов: {error}'
+RELOAD_INTERVAL = 30
+BACKFILL_BATCH = 500
+
+
+class Tenant:
+    """Студент: токен Практикума, чат для уведомлений и курсор опроса.
+
+    Состояние компактно: поля в __slots__, статус - код из
+    homework.STATUS_CODES, заголовки собираются при запросе, а индекс
+    работ создаётся при первой работе.
+    """
+
+    __slots__ = ('token', 'chat_id', 'id', 'current_date', 'failures',
+                 '_status', '_index')
+
+    def __init__(self, token, chat_id, id=None, current_date=None,
+                 status=None, failures=0):
+        """Заполняет идентификатор и курсор по умолчанию.
+
+        Идентификатор всегда строка, как в хранилище: числовой id из
+        файла студентов иначе не совпал бы с сохранённым.
+        """
+        self.token = token
+        self.chat_id = chat_id
+        self.id = str(chat_id if id is None else id)
+        self.current_date = (int(time.time()) if current_date is None
+                             else current_date)
+        self.status = status
+        self.failures = failures
+        self._index = None
+
+    @property
+    def status(self):
+        """Статус самой свежей работы."""
+        return homework.STATUSES[self._status]
+
+    @status.setter
+    def status(self, status):
+        self._status = homework.STATUS_CODES[status]
+
+    @property
+    def headers(self):
+        """Заголовки авторизации студента."""
+        return homework.make_headers(self.token)
+
+    @property
+    def index(self):
+        """Индекс известных статусов работ студента."""
+        if self._index is None:
+            self._index = homework.HomeworkIndex()
+        return self._index
+
+
+def restore_tenants(tenants, store):
+    """Восстанавливает курсоры и статусы студентов из хранилища."""
+    state = store.load()
+    for tenant in tenants:
+        if tenant.id in state:
+            tenant.current_date, tenant.status = state[tenant.id]
+
+
+def load_tenants(path):
+    """Читает студентов из файла JSON Lines."""
+    with open(path, encoding='utf-8') as file:
+        return [Tenant(**json.loads(line)) for line in file if line.strip()]
+
+
+def shard_of(tenant_id, shards):
+    """Возвращает номер шарда студента по стабильному хэшу его id."""
+    return zlib.crc32(str(tenant_id).encode()) % shards
+
+
+class TenantsFile:
+    """Студенты одного шарда из файла, перечитываемого при изменении."""
+
+    def __init__(self, path, shard=0, shards=1):
+        """Запоминает файл и номер шарда."""
+        self.path = path
+        self.shard = shard
+        self.shards = shards
+        self.mtime = None
+
+    def changed(self):
+        """Проверяет, менялся ли файл с последнего чтения."""
+        return os.stat(self.path).st_mtime_ns != self.mtime
+
+    def load(self):
+        """Читает студентов своего шарда."""
+        self.mtime = os.stat(self.path).st_mtime_ns
+        return [tenant for tenant in load_tenants(self.path)
+                if shard_of(tenant.id, self.shards) == self.shard]
+
+
+class StaticTenants:
+    """Неизменный список студентов как источник для Engine.watch."""
+
+    def __init__(self, tenants):
+        """Запоминает студентов."""
+        self.tenants = tenants
+
+    def changed(self):
+        """Список не меняется."""
+        return False
+
+    def load(self):
+        """Возвращает студентов."""
+        return list(self.tenants)
+
+
+class LeasedTenants:
+    """Студенты из source, чьи партиции арендованы этой репликой.
+
+    Партиция студента - shard_of(id, leases.partitions); changed()
+    заодно продлевает аренды. Если задан sender, общий лимит Telegram
+    GLOBAL_RATE делится между живыми репликами: токен бота у них общий.
+    """
+
+    def __init__(self, source, leases, sender=None):
+        """Оборачивает источник студентов арендой партиций."""
+        self.source = source
+        self.leases = leases
+        self.sender = sender
+        self.owned = None
+
+    def _heartbeat(self):
+        owned = self.leases.heartbeat()
+        if self.sender is not None:
+            self.sender.set_global_rate(GLOBAL_RATE / self.leases.live)
+        return owned
+
+    def changed(self):
+        """Проверяет, изменились ли свои партиции или сам источник."""
+        owned = self._heartbeat()
+        return owned != self.owned or self.source.changed()
+
+    def load(self):
+        """Читает студентов своих партиций."""
+        if self.owned is None:
+            self._heartbeat()
+        tenants = self.source.load()
+        self.owned = owned = self.leases.owned
+        return [tenant for tenant in tenants
+                if shard_of(tenant.id, self.leases.partitions) in owned]
+
+
+class Engine:
+    """Опрашивает API для множества студентов в одном цикле событий."""
+
+    def __init__(self, bot, url=homework.ENDPOINT,
+                 concurrency=homework.CONCURRENCY, scheduler=None,
+                 store=None, streaming=homework.STREAMING, sender=None,
+                 cache=None, clock=time.monotonic, fetch=None, executor=None,
+                 budget=transport.POLL_BUDGET, profiler=None, history=None,
+                 subscriptions=None):
+        """Создаёт движок с пулом потоков под лимит одновременных запросов.
+
+        fetch заменяет homework.fetch_api_answer, executor - пул потоков
+        (для записи и воспроизведения трасс). budget - секунды на все
+        запросы одного цикла опроса студента. profiler получает отметку
+        о каждом цикле опроса, history - каждую смену статуса.
+        subscriptions добавляет к чату студента чаты подписчиков.
+        """
+        self.sender = Sender(bot) if sender is None else sender
+        self.url = url
+        self.concurrency = concurrency
+        self.scheduler = Scheduler() if scheduler is None else scheduler
+        self.store = store
+        self.streaming = streaming
+        self.cache = cache
+        self.clock = clock
+        self.fetch = fetch
+        self.budget = budget
+        self.profiler = profiler
+        self.history = history
+        self.subscriptions = subscriptions
+        self.tenants = {}
+        self._queue = []
+        self._counter = itertools.count()
+        self._executor = (ThreadPoolExecutor(max_workers=concurrency)
+                          if executor is None else executor)
+        self._inline = getattr(self._executor, 'inline', False)
+        self._wakeup = None
+        self._running = False
+
+    def add_tenant(self, tenant, delay=0):
+        """Добавляет студента и планирует его первый опрос."""
+        self.tenants[tenant.id] = tenant
+        self._schedule(tenant, self.clock() + delay)
+        self._wake()
+
+    def remove_tenant(self, tenant_id):
+        """Убирает студента из опроса."""
+        return self.tenants.pop(tenant_id, None)
+
+    def sync_tenants(self, tenants):
+        """Добавляет новых студентов и убирает пропавших из списка.
+
+        Неотправленные уведомления убранных студентов снимаются с очереди
+        отправки, но остаются в outbox для их нового владельца.
+        """
+        wanted = {tenant.id: tenant for tenant in tenants}
+        removed = [tenant_id for tenant_id in self.tenants
+                   if tenant_id not in wanted]
+        for tenant_id in removed:
+            self.remove_tenant(tenant_id)
+        if removed and self.store is not None:
+            removed = set(removed)
+            self.sender.discard(
+                outbox_id for outbox_id, tenant_id, _, _ in self.store.outbox()
+                if tenant_id in removed
+            )
+        added = [tenant for tenant_id, tenant in wanted.items()
+                 if tenant_id not in self.tenants]
+        if self.store is not None:
+            restore_tenants(added, self.store)
+        spread = self.scheduler.idle / max(len(added), 1)
+        for number, tenant in enumerate(added):
+            self.add_tenant(tenant, delay=number * spread)
+        return len(added), len(removed)
+
+    async def watch(self, source, interval=RELOAD_INTERVAL):
+        """Периодически сверяет студентов с источником.
+
+        Курсоры убранных студентов сразу сохраняются, а неотправленные
+        уведомления добавленных снова ставятся в очередь: студенты могли
+        перейти от другой реплики.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not source.changed():
+                    continue
+                before = set(self.tenants)
+                added, removed = self.sync_tenants(source.load())
+                if self.store is not None:
+                    self.store.flush()
+                    self.redeliver(set(self.tenants) - before)
+            except Exception as error:
+                logging.error(RELOAD_ERROR.format(error=error))
+                continue
+            logging.info(TENANTS_CHANGED.format(added=added, removed=removed))
+
+    def stop(self):
+        """Останавливает цикл опроса после текущих запросов."""
+        self._running = False
+        self._wake()
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _schedule(self, tenant, deadline):
+        heapq.heappush(self._queue, (deadline, next(self._counter), tenant))
+
+    async def _sleep(self, delay):
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _call(self, func, *args):
+        if self.profiler is not None and self.profiler.active:
+            func, args = self.profiler.call, (func, *args)
+        if self._inline:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, transport.within, self.budget, func, *args
+        )
+
+    async def get_api_answer(self, tenant):
+        """Асинхронно получает ответ API для студента."""
+        return await self._call(
+            homework.fetch_api_answer if self.fetch is None else self.fetch,
+            self.url, tenant.current_date, tenant.headers
+        )
+
+    def send_message(self, chat_id, message, outbox_id=None):
+        """Ставит сообщение в очередь отправки, не блокируя опрос."""
+        self.sender.submit(chat_id, message, outbox_id)
+
+    def recipients(self, tenant, homework_data):
+        """Возвращает чаты для уведомления о работе студента."""
+        if self.subscriptions is None:
+            return [tenant.chat_id]
+        return self.subscriptions.recipients(tenant, homework_data)
+
+    @staticmethod
+    def changes(tenant, homeworks):
+        """Возвращает работы со сменившимся статусом, ничего не запоминая."""
+        return [current_homework for current_homework in homeworks
+                if tenant.index.changed(current_homework)]
+
+    def commit(self, tenant, current_date, changed, status=None):
+        """Сохраняет курсор и уведомления о changed, затем отправляет их.
+
+        changed идут от старых работ к новым, статус студента - статус
+        последней из них или status, если changed пуст. С хранилищем
+        уведомления попадают в outbox в одной транзакции с курсором,
+        поэтому сбой отправки не требует повторного опроса. Курсор и
+        статус студента меняются только после сохранения: если оно не
+        удалось, работы будут запрошены снова. Уведомление о работе
+        формируется один раз и ставится в очередь сразу всем получателям.
+        """
+        messages = []
+        for current_homework in changed:
+            message = homework.parse_status(current_homework)
+            messages.extend(
+                (chat_id, message)
+                for chat_id in self.recipients(tenant, current_homework)
+            )
+        if changed:
+            status = changed[-1]['status']
+        elif status is None:
+            status = tenant.status
+        ids = [None] * len(messages)
+        if self.store is not None:
+            ids = self.store.save(
+                tenant.id, current_date, status, messages=messages
+            ) or ids
+        tenant.status = status
+        tenant.current_date = current_date
+        for current_homework in changed:
+            tenant.index.remember(current_homework)
+        if changed and self.history is not None:
+            self.history.record(tenant.id, changed)
+        if messages:
+            self.sender.submit_many([
+                (chat_id, message, outbox_id)
+                for (chat_id, message), outbox_id in zip(messages, ids)
+            ])
+        if messages and self.cache is not None:
+            self.cache.invalidate(tenant.id)
+
+    def redeliver(self, tenant_ids=None):
+        """Ставит в очередь неотправленные уведомления своих студентов.
+
+        tenant_ids ограничивает студентов, по умолчанию - все свои.
+        """
+        if tenant_ids is None:
+            tenant_ids = self.tenants
+        if not tenant_ids:
+            return
+        for outbox_id, tenant_id, chat_id, message in self.store.outbox():
+            if tenant_id in tenant_ids:
+                self.send_message(chat_id, message, outbox_id)
+
+    def _poll_stream(self, tenant):
+        fields = {}
+        changed = self.changes(tenant, homework.iter_api_answer(
+            self.url, tenant.current_date, tenant.headers, fields
+        ))
+        changed.reverse()
+        return fields, changed
+
+    def _backfill(self, tenant):
+        """Запоминает статусы всех работ студента без уведомлений.
+
+        История читается потоком пачками по BACKFILL_BATCH работ, так что
+        память не растёт с её длиной. Запрос безусловный: ответ 304 на
+        валидаторы /status оставил бы курсор на нуле. Возвращает поля
+        ответа и статус самой свежей работы.
+        """
+        fields = {}
+        transport.CACHE.forget(self.url, tenant.headers, {'from_date': 0})
+        stream = homework.iter_api_answer(self.url, 0, tenant.headers, fields)
+        newest = None
+        while True:
+            batch = list(itertools.islice(stream, BACKFILL_BATCH))
+            if not batch:
+                return fields, newest
+            if newest is None:
+                newest = batch[0]['status']
+            for current_homework in batch:
+                tenant.index.remember(current_homework)
+            if self.history is not None:
+                self.history.record(tenant.id, batch)
+
+    async def _poll_response(self, tenant):
+        response = await self.get_api_answer(tenant)
+        if response is None:
+            return {}, []
+        return response, self.changes(
+            tenant, reversed(homework.check_response(response))
+        )
+
+    async def poll(self, tenant):
+        """Выполняет один цикл опроса студента.
+
+        Ответ читается потоком, если включён STREAMING. Вся история работ
+        (from_date=0) тоже читается потоком и только запоминается: о
+        прошлых статусах студент не уведомляется. Пока статусы не
+        меняются, курсор стоит на месте, и опросы остаются условными.
+        """
+        try:
+            status = None
+            if tenant.current_date == 0:
+                response, status = await self._call(self._backfill, tenant)
+                changed = []
+            elif self.streaming:
+                response, changed = await self._call(
+                    self._poll_stream, tenant
+                )
+            else:
+                response, changed = await self._poll_response(tenant)
+            current_date = response.get('current_date', tenant.current_date)
+            if not changed and tenant.current_date:
+                current_date = tenant.current_date
+            self.commit(tenant, current_date, changed, status)
+            tenant.failures = 0
+        except Exception as error:
+            tenant.failures += 1
+            logging.error(TENANT_ERROR.format(tenant=tenant.id, error=error))
+
+    async def _poll_and_reschedule(self, tenant, deadline, semaphore):
+        try:
+            await self.poll(tenant)
+        finally:
+            semaphore.release()
+        if self.profiler is not None:
+            self.profiler.tick()
+        if self.tenants.get(tenant.id) is tenant:
+            self._schedule(tenant, self.scheduler.next_deadline(
+                deadline, self.clock(), tenant.status, tenant.failures
+            ))
+            self._wake()
+
+    async def run(self):
+        """Опрашивает студентов, пока не вызван stop()."""
+        self._running = True
+        self._wakeup = asyncio.Event()
+        if self.store is not None:
+            self.redeliver()
+        self.sender.start()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        try:
+            while self._running:
+                if not self._queue:
+                    await self._sleep(self.scheduler.idle)
+                    continue
+                deadline, _, tenant = self._queue[0]
+                delay = deadline - self.clock()
+                if delay > 0:
+                    await self._sleep(delay)
+                    continue
+                heapq.heappop(self._queue)
+                if self.tenants.get(tenant.id) is not tenant:
+                    continue
+                await semaphore.acquire()
+                task = asyncio.create_task(
+                    self._poll_and_reschedule(tenant, deadline, semaphore)
+                )
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            self._executor.shutdown(wait=False)
+            self.sender.stop()
+            if self.store is not None:
+                self.store.flush()
+
+
+async def serve(engine, source=None, interval=RELOAD_INTERVAL):
+    """Выполняет движок и, если задан источник, следит за его изменениями."""
+    if source is None:
+        return await engine.run()
+    watcher = asyncio.create_task(engine.watch(source, interval))
+    try:
+        await engine.run()
+    finally:
+        watcher.cancel()
+
+
+def run_engine(tenants, bot, source=None, shards=1,
+               commands=homework.COMMANDS, replica=REPLICA_ID):
+    """Запускает опрос студентов до остановки процесса.
+
+    Если процессов-воркеров несколько, общий лимит Telegram делится
+    между ними поровну, а при LEASES=1 - между всеми живыми репликами.
+    При заданном RECORD_TRACE ответы API пишутся в трассу для
+    воспроизведения. Профилирование включается сигналом
+    PROFILE_SIGNAL или при старте, если PROFILE=1. Смены статусов пишутся
+    в журнал HISTORY_DIR для команды /stats. При LEASES=1 опрашиваются
+    только студенты партиций, арендованных репликой replica. Подписки
+    на уведомления читаются из SUBSCRIPTIONS_FILE.
+    """
+    logging.info(TENANTS_LOADED.format(count=len(tenants)))
+    store = Store()
+    sender = Sender(bot, global_rate=GLOBAL_RATE / shards, outbox=store)
+    leases = None
+    polled = tenants
+    interval = RELOAD_INTERVAL
+    if LEASES:
+        leases = Leases(replica=replica)
+        source = LeasedTenants(
+            source or StaticTenants(tenants), leases, sender
+        )
+        polled = source.load()
+        interval = leases.interval
+    history = History()
+    cache = None
+    if commands:
+        cache = ResponseCache()
+        Commands(tenants, cache, history).start(homework.TELEGRAM_TOKEN)
+    recorder = fetch = None
+    if replay.RECORD_TRACE is not None:
+        recorder = replay.Recorder(replay.RECORD_TRACE)
+        fetch = recorder.wrap(homework.fetch_api_answer)
+    profiler = Profiler()
+    profiler.install()
+    if PROFILE:
+        profiler.request()
+    subscriptions = None
+    if SUBSCRIPTIONS_FILE is not None:
+        subscriptions = Subscriptions.load(SUBSCRIPTIONS_FILE)
+    engine = Engine(
+        bot, store=store, cache=cache, fetch=fetch, profiler=profiler,
+        history=history, subscriptions=subscriptions,
+        sender=sender
+    )
+    engine.sync_tenants(polled)
+    try:
+        asyncio.run(serve(engine, source, interval))
+    finally:
+        store.close()
+        history.close()
+        if leases is not None:
+            leases.close()
+        if recorder is not None:
+            recorder.close()
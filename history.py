@@ -0,0 +1,236 @@
+import datetime
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+import homework
+
+HISTORY_DIR = os.getenv(
+    'HISTORY_DIR', os.path.join(os.path.dirname(__file__), 'history')
+)
+COLUMNS = (
+    ('tenant', 'Q', '<u8'),
+    ('homework', 'q', '<i8'),
+    ('status', 'B', 'u1'),
+    ('at', 'd', '<f8'),
+)
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+PERCENTILES = (50, 90, 99)
+VERDICTS = ('approved', 'rejected')
+HASH_MULTIPLIER = 0x9E3779B1
+
+HISTORY_ERROR = 'Не удалось записать историю статусов: {error}'
+
+
+def tenant_key(tenant_id):
+    """Возвращает 64-битный ключ студента для колонки tenant.
+
+    32-битный crc32 совпадал бы уже у пары студентов из ~100 тысяч, и их
+    /stats сливались бы; у 64-битного blake2b совпадение невероятно.
+    """
+    return int.from_bytes(
+        hashlib.blake2b(str(tenant_id).encode(), digest_size=8).digest(),
+        'little'
+    )
+
+
+def homework_key(homework_data):
+    """Возвращает 64-битный ключ работы: id или crc32 названия."""
+    key = homework.HomeworkIndex.key(homework_data)
+    return key if isinstance(key, int) else zlib.crc32(str(key).encode())
+
+
+def updated_at(homework_data, default):
+    """Возвращает время смены статуса из date_updated или default."""
+    try:
+        return datetime.datetime.strptime(
+            homework_data['date_updated'], DATE_FORMAT
+        ).replace(tzinfo=datetime.timezone.utc).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return default
+
+
+def pairing_order(tenants, homeworks):
+    """Упорядочивает строки так, чтобы смены статусов работы шли подряд.
+
+    Смены статусов одной работы пишутся по порядку, поэтому сортировать
+    по времени не нужно: сортируются значения uint64 из 32-битного хеша
+    студента и работы и номера строки. Это быстрее argsort по полному
+    ключу. Строки работ с совпавшим хешем перемешаны, поэтому только
+    такие группы досортировываются по полному ключу. Возвращает порядок
+    строк и колонки tenants и homeworks в этом порядке.
+    """
+    import numpy as np
+
+    mixed = (tenants.astype(np.uint64) * np.uint64(HASH_MULTIPLIER)
+             + homeworks.astype(np.uint64)) & np.uint64(0xFFFFFFFF)
+    packed = (mixed << np.uint64(32)) | np.arange(len(mixed), dtype=np.uint64)
+    packed.sort()
+    order = (packed & np.uint64(0xFFFFFFFF)).astype(np.intp)
+    hashes = packed >> np.uint64(32)
+    same_hash = hashes[1:] == hashes[:-1]
+    sorted_tenants = tenants[order]
+    sorted_homeworks = homeworks[order]
+    collided = same_hash & (
+        (sorted_tenants[1:] != sorted_tenants[:-1])
+        | (sorted_homeworks[1:] != sorted_homeworks[:-1])
+    )
+    if collided.any():
+        runs = np.concatenate(([0], np.cumsum(~same_hash)))
+        mixed_runs = np.zeros(runs[-1] + 1, dtype=bool)
+        mixed_runs[runs[1:][collided]] = True
+        rows = np.flatnonzero(mixed_runs[runs])
+        group = order[rows]
+        order[rows] = group[np.lexsort(
+            (group, homeworks[group], tenants[group], hashes[rows])
+        )]
+        sorted_tenants[rows] = tenants[order[rows]]
+        sorted_homeworks[rows] = homeworks[order[rows]]
+    return order, sorted_tenants, sorted_homeworks
+
+
+class History:
+    """Журнал смен статусов работ в колоночных файлах только на дозапись.
+
+    Каждый процесс пишет свой сегмент - каталог с файлом на колонку
+    (студент, работа, код статуса, время). Для отчётов сегменты
+    отображаются в память через numpy.memmap; недописанная строка в
+    конце сегмента отбрасывается.
+    """
+
+    def __init__(self, directory=HISTORY_DIR, clock=time.time):
+        """Создаёт журнал; сегмент открывается при первой записи."""
+        self.directory = directory
+        self.clock = clock
+        self._files = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        segment = tempfile.mkdtemp(
+            prefix='segment-{stamp}-{pid}-'.format(
+                stamp=int(time.time() * 1000), pid=os.getpid()
+            ),
+            dir=self.directory
+        )
+        return [open(os.path.join(segment, name), 'ab')
+                for name, _, _ in COLUMNS]
+
+    def write(self, tenants, homeworks, statuses, times):
+        """Дописывает строки, заданные колонками одинаковой длины."""
+        count = len(tenants)
+        if not count:
+            return
+        chunks = [
+            struct.pack(f'<{count}{code}', *values)
+            for (_, code, _), values in zip(
+                COLUMNS, (tenants, homeworks, statuses, times)
+            )
+        ]
+        try:
+            with self._lock:
+                if self._files is None:
+                    self._files = self._open()
+                for file, chunk in zip(self._files, chunks):
+                    file.write(chunk)
+                for file in self._files:
+                    file.flush()
+        except OSError as error:
+            logging.error(HISTORY_ERROR.format(error=error))
+
+    def record(self, tenant_id, changed):
+        """Записывает смены статусов работ студента."""
+        now = self.clock()
+        self.write(
+            [tenant_key(tenant_id)] * len(changed),
+            [homework_key(item) for item in changed],
+            [homework.STATUS_CODES[item['status']] for item in changed],
+            [updated_at(item, now) for item in changed],
+        )
+
+    def close(self):
+        """Закрывает файлы текущего сегмента."""
+        with self._lock:
+            for file in self._files or ():
+                file.close()
+            self._files = None
+
+    def columns(self):
+        """Возвращает словарь колонок всех сегментов как массивы numpy."""
+        import numpy as np
+
+        parts = {name: [] for name, _, _ in COLUMNS}
+        segments = (sorted(os.listdir(self.directory))
+                    if os.path.isdir(self.directory) else [])
+        for segment in segments:
+            paths = [os.path.join(self.directory, segment, name)
+                     for name, _, _ in COLUMNS]
+            if not all(os.path.exists(path) for path in paths):
+                continue
+            rows = min(
+                os.path.getsize(path) // np.dtype(dtype).itemsize
+                for path, (_, _, dtype) in zip(paths, COLUMNS)
+            )
+            if not rows:
+                continue
+            for path, (name, _, dtype) in zip(paths, COLUMNS):
+                parts[name].append(
+                    np.memmap(path, dtype=dtype, mode='r', shape=(rows,))
+                )
+        columns = {}
+        for name, _, dtype in COLUMNS:
+            arrays = parts[name]
+            if not arrays:
+                columns[name] = np.empty(0, dtype=dtype)
+            elif len(arrays) == 1:
+                columns[name] = arrays[0]
+            else:
+                columns[name] = np.concatenate(arrays)
+        return columns
+
+    def report(self, tenant_id=None):
+        """Считает сроки проверки и долю возвратов.
+
+        Срок проверки - время от статуса reviewing до следующего
+        вердикта той же работы. Без tenant_id отчёт по всем студентам.
+        """
+        import numpy as np
+
+        columns = self.columns()
+        if tenant_id is not None:
+            mine = columns['tenant'] == tenant_key(tenant_id)
+            columns = {name: column[mine] for name, column in columns.items()}
+        order, tenants, homeworks = pairing_order(
+            columns['tenant'], columns['homework']
+        )
+        statuses = columns['status'][order]
+        times = columns['at'][order]
+        verdicts = np.isin(
+            statuses, [homework.STATUS_CODES[status] for status in VERDICTS]
+        )
+        reviewed = (
+            (tenants[1:] == tenants[:-1])
+            & (homeworks[1:] == homeworks[:-1])
+            & (statuses[:-1] == homework.STATUS_CODES['reviewing'])
+            & verdicts[1:]
+        )
+        turnaround = (times[1:] - times[:-1])[reviewed]
+        rejected = int(np.count_nonzero(
+            statuses == homework.STATUS_CODES['rejected']
+        ))
+        total = int(np.count_nonzero(verdicts))
+        report = {
+            'events': len(statuses),
+            'verdicts': total,
+            'reject_rate': rejected / total if total else float('nan'),
+        }
+        values = (np.percentile(turnaround, PERCENTILES) if len(turnaround)
+                  else [float('nan')] * len(PERCENTILES))
+        for percentile, value in zip(PERCENTILES, values):
+            report[f'turnaround_p{percentile}'] = float(value)
+        return report
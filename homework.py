@@ -1,11 +1,16 @@
 import http
 import logging
 import os
-import time
+import sys
 
 from dotenv import load_dotenv
 import requests
-import telegram
+
+import botapi
+from logs import setup_logging
+import metrics
+from streaming import CHUNK_SIZE, HomeworkStream
+import transport
 
 load_dotenv()
 
@@ -25,36 +30,58 @@ ERROR_MESSAGE = 'Сбой в работе программы: {error}'
 EMPTY_CONST = 'Обязательная переменная пуста!'
 EMPTY_LIST = 'Получен пустой список: {error}'
 UNKNOWN_STATUS = 'Неизвестный статус: {status}'
+NOT_A_LIST = 'Ожидался список работ, получен {type}'
 
-RETRY_TIME = 300
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+TENANTS_FILE = os.getenv('TENANTS_FILE')
+CONCURRENCY = int(os.getenv('CONCURRENCY', 64))
+STREAMING = os.getenv('STREAMING', '') == '1'
+COMMANDS = os.getenv('COMMANDS', '') == '1'
+WORKERS = int(os.getenv('WORKERS', 1))
 
 HOMEWORK_VERDICTS = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена, в ней нашлись ошибки.'
 }
+STATUSES = (None, *HOMEWORK_VERDICTS)
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
 TOKENS = ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'CHAT_ID')
 
 
+def make_headers(token):
+    """Возвращает заголовки авторизации для токена студента."""
+    return {'Authorization': f'OAuth {token}'}
+
+
+def send_message_to(bot, chat_id, message):
+    """Отправляет сообщение через бота в указанный чат."""
+    bot.send_message(chat_id, message)
+
+
 def send_message(bot, message):
     """Отправляет сообщение через бота."""
-    bot.send_message(CHAT_ID, message)
+    send_message_to(bot, CHAT_ID, message)
 
 
-def get_api_answer(url, current_timestamp):
-    """Получает ответ API и проверяет его."""
+@metrics.timed('get_api_answer')
+def fetch_api_answer(url, current_timestamp, headers):
+    """Получает ответ API с заданными заголовками и проверяет его."""
     request_params = dict(
         url=url,
-        headers=HEADERS,
+        headers=headers,
         params={'from_date': current_timestamp}
     )
+    metrics.POLLS.inc()
     try:
-        response = requests.get(**request_params)
+        response = transport.get(**request_params)
+        if response.status_code == http.HTTPStatus.NOT_MODIFIED:
+            return None
         response_json = response.json()
     except requests.exceptions.RequestException as error:
+        metrics.ERRORS.inc('no_response')
         raise ConnectionError(NO_RESPONSE.format(
             error=error,
             **request_params
@@ -62,19 +89,78 @@ def get_api_answer(url, current_timestamp):
 
     for key in ('code', 'error'):
         if key in response_json:
+            metrics.ERRORS.inc('certificate_or_time_fail')
             raise RuntimeError(CERTIFICATE_OR_TIME_FAIL.format(
                 error=key,
                 **request_params,
                 value=response_json[key]
             ))
     if response.status_code != http.HTTPStatus.OK:
+        metrics.ERRORS.inc('unsuitable_status_code')
         raise RuntimeError(UNSUITABLE_STATUS_CODE.format(
             code=response.status_code,
             **request_params
         ))
+    transport.CACHE.remember(
+        url, headers, request_params['params'], response
+    )
     return response_json
 
 
+def iter_api_answer(url, current_timestamp, headers, fields):
+    """Получает ответ API потоком и по одной отдаёт проверенные работы.
+
+    Остальные поля ответа (current_date) складываются в fields.
+    """
+    request_params = dict(
+        url=url,
+        headers=headers,
+        params={'from_date': current_timestamp}
+    )
+    metrics.POLLS.inc()
+    try:
+        response = transport.get(**request_params, stream=True)
+        with response:
+            if response.status_code == http.HTTPStatus.NOT_MODIFIED:
+                return
+            if response.status_code != http.HTTPStatus.OK:
+                metrics.ERRORS.inc('unsuitable_status_code')
+                raise RuntimeError(UNSUITABLE_STATUS_CODE.format(
+                    code=response.status_code,
+                    **request_params
+                ))
+            stream = HomeworkStream(
+                transport.bounded(response.iter_content(CHUNK_SIZE))
+            )
+            for homework in stream:
+                yield check_homework(homework)
+            fields.update(stream.fields)
+    except requests.exceptions.RequestException as error:
+        metrics.ERRORS.inc('no_response')
+        raise ConnectionError(NO_RESPONSE.format(
+            error=error,
+            **request_params
+        ))
+
+    for key in ('code', 'error'):
+        if key in fields:
+            metrics.ERRORS.inc('certificate_or_time_fail')
+            raise RuntimeError(CERTIFICATE_OR_TIME_FAIL.format(
+                error=key,
+                **request_params,
+                value=fields[key]
+            ))
+    transport.CACHE.remember(
+        url, headers, request_params['params'], response
+    )
+
+
+def get_api_answer(url, current_timestamp):
+    """Получает ответ API и проверяет его."""
+    return fetch_api_answer(url, current_timestamp, HEADERS)
+
+
+@metrics.timed('parse_status')
 def parse_status(homework):
     """Возвращает сообщение с изменившимся статусом дз."""
     return STATUS_CHANGED.format(
@@ -83,44 +169,109 @@ def parse_status(homework):
     )
 
 
-def check_response(response):
-    """Проверяет ответ на корректность."""
-    homework = response['homeworks'][0]
+def check_homework(homework):
+    """Проверяет, что статус работы известен."""
     if homework["status"] not in HOMEWORK_VERDICTS:
+        metrics.ERRORS.inc('unknown_status')
         raise ValueError(UNKNOWN_STATUS.format(status=homework["status"]))
-
     return homework
 
 
-def main():
-    """Основная функция."""
-    for const in TOKENS:
+@metrics.timed('check_response')
+def check_response(response):
+    """Проверяет ответ на корректность и возвращает список работ."""
+    homeworks = response['homeworks']
+    if not isinstance(homeworks, list):
+        raise TypeError(NOT_A_LIST.format(type=type(homeworks).__name__))
+    for homework in homeworks:
+        check_homework(homework)
+
+    return homeworks
+
+
+class HomeworkIndex:
+    """Последние известные статусы работ по их идентификаторам.
+
+    Статусы хранятся кодами из STATUS_CODES.
+    """
+
+    __slots__ = ('statuses',)
+
+    def __init__(self):
+        """Создаёт пустой индекс."""
+        self.statuses = {}
+
+    @staticmethod
+    def key(homework):
+        """Возвращает ключ работы: id, а без него - название."""
+        return homework.get('id', homework['homework_name'])
+
+    def changed(self, homework):
+        """Проверяет, отличается ли статус работы от известного."""
+        return (self.statuses.get(self.key(homework))
+                != STATUS_CODES.get(homework['status']))
+
+    def changes(self, homeworks):
+        """Возвращает работы со сменившимся статусом, от старых к новым."""
+        return [homework for homework in reversed(homeworks)
+                if self.changed(homework)]
+
+    def remember(self, homework):
+        """Запоминает статус работы после отправки уведомления."""
+        self.statuses[self.key(homework)] = STATUS_CODES[homework['status']]
+
+
+def check_tokens(names):
+    """Проверяет, что обязательные переменные окружения заданы."""
+    for const in names:
         if globals()[const] is None:
             logging.critical(CONST_ERROR.format(const=const))
             raise ValueError(EMPTY_CONST)
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
-    while True:
-        try:
-            response = get_api_answer(ENDPOINT, current_timestamp)
-            homework = check_response(response)
-            message = parse_status(homework)
-            send_message(bot, message)
-            current_timestamp = response.get('current_date', current_timestamp)
 
-        except Exception as error:
-            logging.error(ERROR_MESSAGE.format(error=error))
-        time.sleep(RETRY_TIME)
+
+def make_bot():
+    """Создаёт клиент Bot API для отправки уведомлений."""
+    return botapi.Bot(TELEGRAM_TOKEN)
+
+
+def supervise():
+    """Запускает воркеры по шардам студентов и команды в этом процессе.
+
+    Команда /stats читает журнал HISTORY_DIR, который пишут воркеры.
+    """
+    from supervisor import Supervisor
+
+    if COMMANDS:
+        from commands import Commands, ResponseCache
+        from engine import load_tenants
+        from history import History
+
+        Commands(
+            load_tenants(TENANTS_FILE), ResponseCache(), History()
+        ).start(TELEGRAM_TOKEN)
+    Supervisor(WORKERS).run()
+
+
+def main():
+    """Основная функция."""
+    from engine import Tenant, TenantsFile, run_engine
+
+    if TENANTS_FILE is not None:
+        check_tokens(('TELEGRAM_TOKEN',))
+        if WORKERS > 1:
+            return supervise()
+    else:
+        check_tokens(TOKENS)
+    if metrics.METRICS_PORT is not None:
+        metrics.start_server()
+    if TENANTS_FILE is None:
+        return run_engine([Tenant(PRACTICUM_TOKEN, CHAT_ID)], make_bot())
+    source = TenantsFile(TENANTS_FILE)
+    run_engine(source.load(), make_bot(), source=source)
 
 
 if __name__ == '__main__':
-    logging.basicConfig(
-        level=logging.DEBUG,
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler(__file__ + '.log')
-        ],
-        format='%(asctime)s, %(levelname)s, %(name)s, %(lineno)s, %(message)s,'
-    )
+    sys.modules.setdefault('homework', sys.modules[__name__])
+    setup_logging(__file__ + '.log')
 
     main()
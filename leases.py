@@ -0,0 +1,154 @@
+import logging
+import math
+import os
+import socket
+import sqlite3
+import time
+
+from storage import STATE_DB
+import transport
+
+LEASES = os.getenv('LEASES', '') == '1'
+LEASE_DB = os.getenv('LEASE_DB', STATE_DB)
+PARTITIONS = int(os.getenv('PARTITIONS', 64))
+LEASE_TTL = float(os.getenv('LEASE_TTL', 30))
+HEARTBEAT_INTERVAL = float(os.getenv('HEARTBEAT_INTERVAL', LEASE_TTL / 3))
+REPLICA_ID = os.getenv(
+    'REPLICA_ID', f'{socket.gethostname()}-{os.getpid()}'
+)
+LOCK_TIMEOUT = 1
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS leases (
+    id INTEGER PRIMARY KEY,
+    owner TEXT,
+    expires REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS replicas (
+    id TEXT PRIMARY KEY,
+    expires REAL NOT NULL
+);
+'''
+JOIN = '''
+INSERT INTO replicas (id, expires) VALUES (?, ?)
+ON CONFLICT (id) DO UPDATE SET expires = excluded.expires
+'''
+
+HEARTBEAT_ERROR = 'Не удалось продлить аренду партиций: {error}'
+LEASES_CHANGED = 'Реплика {replica} владеет партициями: {partitions}'
+
+
+class Leases:
+    """Аренда партиций студентов репликами бота через общую базу SQLite.
+
+    Каждая реплика раз в interval секунд продлевает свои аренды на ttl
+    и выравнивает их число до честной доли: лишние отпускает, свободные
+    и просроченные забирает. Отпущенная партиция ещё drain секунд никому
+    не выдаётся, чтобы начатые опросы прежнего владельца завершились.
+    Партиции упавшей реплики забираются после истечения ttl. live -
+    число живых реплик при последнем продлении.
+    """
+
+    def __init__(self, path=LEASE_DB, replica=REPLICA_ID,
+                 partitions=PARTITIONS, ttl=LEASE_TTL,
+                 interval=HEARTBEAT_INTERVAL, drain=transport.POLL_BUDGET,
+                 clock=time.time):
+        """Открывает базу и заводит строки аренды для всех партиций."""
+        self.connection = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False,
+            timeout=LOCK_TIMEOUT
+        )
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+        self.connection.executemany(
+            'INSERT OR IGNORE INTO leases (id) VALUES (?)',
+            [(partition,) for partition in range(partitions)]
+        )
+        self.replica = replica
+        self.partitions = partitions
+        self.ttl = ttl
+        self.interval = interval
+        self.drain = drain
+        self.clock = clock
+        self.owned = frozenset()
+        self.live = 1
+        self.valid_until = 0
+
+    def _balance(self, now):
+        self.connection.execute(JOIN, (self.replica, now + self.ttl))
+        self.connection.execute(
+            'DELETE FROM replicas WHERE expires <= ?', (now,)
+        )
+        live, = self.connection.execute(
+            'SELECT COUNT(*) FROM replicas'
+        ).fetchone()
+        self.live = live
+        share = math.ceil(self.partitions / live)
+        self.connection.execute(
+            'UPDATE leases SET expires = ? WHERE owner = ?',
+            (now + self.ttl, self.replica)
+        )
+        owned = [partition for partition, in self.connection.execute(
+            'SELECT id FROM leases WHERE owner = ? ORDER BY id',
+            (self.replica,)
+        )]
+        if len(owned) > share:
+            self.connection.executemany(
+                'UPDATE leases SET owner = NULL, expires = ? WHERE id = ?',
+                [(now + self.drain, partition)
+                 for partition in owned[share:]]
+            )
+            return owned[:share]
+        free = [partition for partition, in self.connection.execute(
+            'SELECT id FROM leases WHERE expires <= ? ORDER BY id LIMIT ?',
+            (now, share - len(owned))
+        )]
+        self.connection.executemany(
+            'UPDATE leases SET owner = ?, expires = ? WHERE id = ?',
+            [(self.replica, now + self.ttl, partition) for partition in free]
+        )
+        return sorted(owned + free)
+
+    def heartbeat(self):
+        """Продлевает аренды и возвращает множество своих партиций.
+
+        Если базу не удалось обновить, партиции остаются своими, пока
+        до истечения аренды больше interval секунд, а затем отпускаются.
+        """
+        now = self.clock()
+        try:
+            with self.connection:
+                self.connection.execute('BEGIN IMMEDIATE')
+                owned = frozenset(self._balance(now))
+        except sqlite3.Error as error:
+            logging.error(HEARTBEAT_ERROR.format(error=error))
+            if self.valid_until - self.clock() <= self.interval:
+                self.owned = frozenset()
+            return self.owned
+        self.valid_until = now + self.ttl
+        if owned != self.owned:
+            logging.info(LEASES_CHANGED.format(
+                replica=self.replica, partitions=sorted(owned)
+            ))
+        self.owned = owned
+        return owned
+
+    def release(self):
+        """Сразу отпускает все аренды реплики, например при остановке."""
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            self.connection.execute(
+                'UPDATE leases SET owner = NULL, expires = 0 WHERE owner = ?',
+                (self.replica,)
+            )
+            self.connection.execute(
+                'DELETE FROM replicas WHERE id = ?', (self.replica,)
+            )
+        self.owned = frozenset()
+
+    def close(self):
+        """Отпускает аренды и закрывает базу."""
+        try:
+            self.release()
+        finally:
+            self.connection.close()
@@ -0,0 +1,142 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+LOG_FORMAT = (
+    '%(asctime)s, %(levelname)s, %(name)s, %(lineno)s, %(message)s,'
+)
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUPS = int(os.getenv('LOG_BACKUPS', 5))
+LOG_ROTATE_INTERVAL = float(os.getenv('LOG_ROTATE_INTERVAL', 24 * 60 * 60))
+LOG_REPEAT_INTERVAL = float(os.getenv('LOG_REPEAT_INTERVAL', 10 * 60))
+
+REPEATED = 'Сообщение повторилось ещё {count} раз: {message}'
+
+
+class RotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Ротирует файл лога по размеру и по прошествии интервала."""
+
+    def __init__(self, filename, max_bytes=LOG_MAX_BYTES,
+                 backup_count=LOG_BACKUPS, interval=LOG_ROTATE_INTERVAL):
+        """Создаёт обработчик; файл открывается при первой записи."""
+        super().__init__(
+            filename, maxBytes=max_bytes, backupCount=backup_count,
+            encoding='utf-8', delay=True
+        )
+        self.interval = interval
+        self.rollover_at = time.time() + interval
+
+    def shouldRollover(self, record):
+        """Проверяет, пора ли начать новый файл."""
+        if time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        """Начинает новый файл и переносит срок следующей ротации."""
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval
+
+
+class RepeatFilter(logging.Filter):
+    """Подавляет повторы одинаковых предупреждений и ошибок.
+
+    Первое сообщение проходит сразу, повторы в течение interval
+    считаются; следующее прошедшее сообщение и сводки по затихшим
+    повторам сообщают, сколько раз оно было подавлено.
+    """
+
+    def __init__(self, interval=LOG_REPEAT_INTERVAL, level=logging.WARNING,
+                 clock=time.monotonic):
+        """Создаёт фильтр с окном подавления interval секунд."""
+        super().__init__()
+        self.interval = interval
+        self.level = level
+        self.clock = clock
+        self.handler = None
+        self._seen = {}
+        self._checked_at = clock()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _summary(key, count):
+        name, level, message = key
+        return logging.makeLogRecord(dict(
+            name=name, levelno=level, levelname=logging.getLevelName(level),
+            msg=REPEATED.format(count=count, message=message)
+        ))
+
+    def filter(self, record):
+        """Пропускает запись, если она не повторяет недавнюю."""
+        if record.levelno < self.level:
+            return True
+        key = (record.name, record.levelno, record.getMessage())
+        now = self.clock()
+        with self._lock:
+            seen = self._seen.get(key)
+            if seen is not None and now - seen[1] < self.interval:
+                seen[0] += 1
+                return False
+            self._seen[key] = [0, now]
+            expired = self._expire(now)
+        if seen is not None and seen[0]:
+            record.msg = REPEATED.format(count=seen[0], message=key[2])
+            record.args = None
+        if self.handler is not None:
+            for summary in expired:
+                self.handler.handle(summary)
+        return True
+
+    def _expire(self, now):
+        if now - self._checked_at < self.interval:
+            return []
+        self._checked_at = now
+        stale = [key for key, (_, seen_at) in self._seen.items()
+                 if now - seen_at >= self.interval]
+        return [self._summary(key, count)
+                for key, count in ((key, self._seen.pop(key)[0])
+                                   for key in stale)
+                if count]
+
+    def flush(self):
+        """Возвращает сводки по всем подавленным повторам."""
+        with self._lock:
+            seen, self._seen = self._seen, {}
+        return [self._summary(key, count)
+                for key, (count, _) in seen.items() if count]
+
+
+def setup_logging(path, level=logging.DEBUG):
+    """Настраивает запись логов в фоновом потоке.
+
+    Записи попадают в очередь, из которой их пишет QueueListener в
+    консоль и в файл с ротацией; повторы ошибок подавляются.
+    """
+    records = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    repeats = RepeatFilter()
+    repeats.handler = queue_handler
+    queue_handler.addFilter(repeats)
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = (logging.StreamHandler(), RotatingFileHandler(path))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    listener = logging.handlers.QueueListener(
+        records, *handlers, respect_handler_level=True
+    )
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.handlers[:] = [queue_handler]
+    listener.start()
+
+    def stop():
+        for summary in repeats.flush():
+            records.put(summary)
+        listener.stop()
+
+    atexit.register(stop)
+    return listener
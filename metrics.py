@@ -0,0 +1,165 @@
+import bisect
+import functools
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import threading
+import time
+
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = os.getenv('METRICS_PORT')
+PREFIX = 'homework_bot_'
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _labels(label, value, extra=''):
+    pairs = [f'{label}="{value}"'] if label is not None else []
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Счётчик с необязательной меткой."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, label=None):
+        """Создаёт счётчик с нулевыми значениями."""
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value=None, amount=1):
+        """Увеличивает счётчик для значения метки."""
+        with self._lock:
+            self._values[value] = self._values.get(value, 0) + amount
+
+    def get(self, value=None):
+        """Возвращает текущее значение счётчика."""
+        return self._values.get(value, 0)
+
+    def samples(self):
+        """Возвращает строки в текстовом формате Prometheus."""
+        with self._lock:
+            values = sorted(self._values.items(), key=str)
+        return [f'{self.name}{_labels(self.label, value)} {count}'
+                for value, count in values]
+
+
+class Histogram:
+    """Гистограмма длительностей с фиксированными корзинами."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, label=None, buckets=BUCKETS):
+        """Создаёт пустую гистограмму."""
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, value=None):
+        """Добавляет наблюдение для значения метки."""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(value)
+            if series is None:
+                series = self._series[value] = [
+                    [0] * (len(self.buckets) + 1), 0.0
+                ]
+            series[0][index] += 1
+            series[1] += seconds
+
+    def count(self, value=None):
+        """Возвращает число наблюдений."""
+        series = self._series.get(value)
+        return sum(series[0]) if series else 0
+
+    def samples(self):
+        """Возвращает строки в текстовом формате Prometheus."""
+        with self._lock:
+            series = sorted(
+                ((value, list(counts), total)
+                 for value, (counts, total) in self._series.items()),
+                key=lambda item: str(item[0])
+            )
+        lines = []
+        for value, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append('{}_bucket{} {}'.format(
+                    self.name, _labels(self.label, value, f'le="{bound}"'),
+                    cumulative
+                ))
+            labels = _labels(self.label, value)
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    'stage_seconds', 'Длительность стадий цикла опроса.', label='stage'
+)
+POLLS = Counter('polls_total', 'Запросы к API Практикума.')
+ERRORS = Counter('errors_total', 'Ошибки по типам.', label='type')
+MESSAGES = Counter('messages_sent_total', 'Отправленные сообщения Telegram.')
+HEDGES = Counter('hedged_requests_total', 'Дублирующие запросы к API.')
+REGISTRY = (STAGE_SECONDS, POLLS, ERRORS, MESSAGES, HEDGES)
+
+
+def timed(stage):
+    """Декоратор: измеряет длительность вызова как стадию цикла."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage)
+        return wrapper
+    return decorator
+
+
+def render(registry=REGISTRY):
+    """Возвращает все метрики в текстовом формате Prometheus."""
+    lines = []
+    for metric in registry:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Отдаёт метрики по адресу /metrics."""
+
+    def log_message(self, format, *args):
+        """Не пишет лог запросов."""
+
+    def do_GET(self):
+        """Отвечает текстом метрик."""
+        if self.path != '/metrics':
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        body = render().encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Запускает HTTP-сервер метрик в фоновом потоке."""
+    server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,133 @@
+import cProfile
+import logging
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+
+PROFILE = os.getenv('PROFILE', '') == '1'
+PROFILE_WINDOW = int(os.getenv('PROFILE_WINDOW', 1000))
+PROFILE_DIR = os.getenv(
+    'PROFILE_DIR', os.path.join(os.path.dirname(__file__), 'profiles')
+)
+PROFILE_SIGNAL = getattr(signal, os.getenv('PROFILE_SIGNAL', 'SIGUSR1'))
+TRACEMALLOC_FRAMES = 10
+TOP_ALLOCATIONS = 50
+PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+PROFILE_STARTED = 'Профилирование запущено на {window} циклов опроса'
+PROFILE_SAVED = 'Профиль сохранён: {path}'
+PROFILE_ERROR = 'Не удалось включить профилировщик потока: {error}'
+
+
+class Profiler:
+    """Профилирует окно из window циклов опроса по запросу.
+
+    Пока профилирование не запрошено, tick() только проверяет флаги, а
+    cProfile и tracemalloc выключены. По окончании окна в directory
+    пишутся статистика pstats, снимок tracemalloc и текстовый список
+    крупнейших выделений памяти. До Python 3.12 каждый поток пула
+    профилируется своим cProfile; начиная с 3.12 активен только один
+    cProfile на процесс, и он сам видит все потоки.
+    """
+
+    def __init__(self, window=PROFILE_WINDOW, directory=PROFILE_DIR,
+                 clock=time.time):
+        """Создаёт выключенный профилировщик."""
+        self.window = window
+        self.directory = directory
+        self.clock = clock
+        self.requested = False
+        self.active = False
+        self.remaining = 0
+        self._profiles = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def request(self, *args):
+        """Запрашивает профилирование; годится как обработчик сигнала."""
+        self.requested = True
+
+    def install(self, signum=PROFILE_SIGNAL):
+        """Включает профилирование по сигналу signum."""
+        signal.signal(signum, self.request)
+
+    def tick(self):
+        """Отмечает завершённый цикл опроса."""
+        if self.active:
+            self.remaining -= 1
+            if self.remaining <= 0:
+                return self.stop()
+        elif self.requested:
+            self.start()
+
+    def _profile(self):
+        profile = getattr(self._local, 'profile', None)
+        if profile is None:
+            profile = self._local.profile = cProfile.Profile()
+            with self._lock:
+                self._profiles.append(profile)
+        return profile
+
+    def call(self, func, *args):
+        """Вызывает func под профилировщиком текущего потока.
+
+        Если профилировщик включить не удалось, func вызывается без него.
+        """
+        if not PER_THREAD_PROFILES or getattr(self._local, 'enabled', False):
+            return func(*args)
+        profile = self._profile()
+        try:
+            profile.enable()
+        except ValueError as error:
+            logging.warning(PROFILE_ERROR.format(error=error))
+            return func(*args)
+        self._local.enabled = True
+        try:
+            return func(*args)
+        finally:
+            profile.disable()
+            self._local.enabled = False
+
+    def start(self):
+        """Начинает окно профилирования в текущем потоке."""
+        self.requested = False
+        self.active = True
+        self.remaining = self.window
+        self._local = threading.local()
+        self._profiles = []
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._local.enabled = True
+        self._profile().enable()
+        logging.info(PROFILE_STARTED.format(window=self.window))
+
+    def stop(self):
+        """Завершает окно и сохраняет результаты.
+
+        Возвращает общий путь файлов без расширения.
+        """
+        self._profile().disable()
+        self._local.enabled = False
+        self.active = False
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, 'profile-{pid}-{stamp}'.format(
+            pid=os.getpid(),
+            stamp=time.strftime('%Y%m%d-%H%M%S', time.gmtime(self.clock()))
+        ))
+        with self._lock:
+            profiles = list(self._profiles)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(path + '.pstats')
+        snapshot.dump(path + '.tracemalloc')
+        with open(path + '.top.txt', 'w', encoding='utf-8') as file:
+            for statistic in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+                file.write(f'{statistic}\n')
+        logging.info(PROFILE_SAVED.format(path=path))
+        return path
@@ -0,0 +1,283 @@
+import asyncio
+import bisect
+from concurrent.futures import Executor, Future
+import json
+import logging
+import math
+import os
+import random
+import selectors
+import threading
+import time
+import zlib
+
+import homework
+
+RECORD_TRACE = os.getenv('RECORD_TRACE')
+TRACE_FIELDS = ('id', 'homework_name', 'status')
+
+RECORD_ERROR = 'Не удалось записать ответ API в трассу: {error}'
+
+
+def trace_id(headers):
+    """Возвращает короткий id студента в трассе, не раскрывая токен."""
+    return format(zlib.crc32(headers['Authorization'].encode()), '08x')
+
+
+class Recorder:
+    """Пишет ответы get_api_answer в компактную трассу JSON Lines.
+
+    Из работ сохраняются только id, название и статус; ответ 304
+    записывается без работ, ошибка - только текстом.
+    """
+
+    def __init__(self, path, clock=time.time):
+        """Открывает трассу на дозапись."""
+        self.file = open(path, 'a', encoding='utf-8')
+        self.clock = clock
+        self._lock = threading.Lock()
+
+    def write(self, headers, current_timestamp, response=None, error=None):
+        """Добавляет в трассу один опрос."""
+        record = {
+            'at': round(self.clock(), 3),
+            'tenant': trace_id(headers),
+            'from': current_timestamp,
+        }
+        if error is not None:
+            record['error'] = str(error)
+        elif response is not None:
+            record['homeworks'] = [
+                {key: item[key] for key in TRACE_FIELDS if key in item}
+                for item in response.get('homeworks', [])
+            ]
+            record['current_date'] = response.get('current_date')
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        try:
+            with self._lock:
+                self.file.write(line + '\n')
+                self.file.flush()
+        except OSError as error:
+            logging.error(RECORD_ERROR.format(error=error))
+
+    def wrap(self, fetch):
+        """Возвращает fetch_api_answer, записывающий каждый вызов."""
+        def recorded(url, current_timestamp, headers):
+            try:
+                response = fetch(url, current_timestamp, headers)
+            except Exception as error:
+                self.write(headers, current_timestamp, error=error)
+                raise
+            self.write(headers, current_timestamp, response)
+            return response
+        return recorded
+
+    def close(self):
+        """Закрывает трассу."""
+        self.file.close()
+
+
+class Trace:
+    """Записанная трасса: смены статусов и сбои каждого студента."""
+
+    def __init__(self, records):
+        """Строит хронологию по записям трассы в порядке их времени."""
+        self.start = None
+        self.end = None
+        self.updates = {}
+        self.polls = {}
+        self.published = {}
+        seen = set()
+        for record in sorted(records, key=lambda record: record['at']):
+            at, tenant = record['at'], record['tenant']
+            if self.start is None:
+                self.start = at
+            self.end = at
+            polls = self.polls.setdefault(tenant, ([], []))
+            polls[0].append(at)
+            polls[1].append(record.get('error'))
+            for item in reversed(record.get('homeworks', [])):
+                change = (tenant, homework.HomeworkIndex.key(item),
+                          item['status'])
+                if change in seen:
+                    continue
+                seen.add(change)
+                updates = self.updates.setdefault(tenant, ([], []))
+                updates[0].append(at)
+                updates[1].append(item)
+                self.published.setdefault(
+                    (tenant, homework.parse_status(item)), at
+                )
+
+    @classmethod
+    def load(cls, path):
+        """Читает трассу из файла."""
+        with open(path, encoding='utf-8') as file:
+            return cls(json.loads(line) for line in file if line.strip())
+
+    @property
+    def tenants(self):
+        """Возвращает id студентов трассы."""
+        return sorted(self.polls)
+
+    def answer(self, tenant, current_timestamp, now):
+        """Отвечает так, как ответил бы API в момент now.
+
+        Если ближайший предыдущий записанный опрос завершился ошибкой,
+        она повторяется.
+        """
+        times, errors = self.polls.get(tenant, ([], []))
+        position = bisect.bisect_right(times, now) - 1
+        if position >= 0 and errors[position] is not None:
+            raise ConnectionError(errors[position])
+        times, items = self.updates.get(tenant, ([], []))
+        first = bisect.bisect_left(times, current_timestamp)
+        last = bisect.bisect_right(times, now)
+        return {
+            'homeworks': items[first:last][::-1],
+            'current_date': int(now),
+        }
+
+
+class VirtualClock:
+    """Часы, которые идут только когда их переводят."""
+
+    def __init__(self, now=0.0):
+        """Ставит часы на now."""
+        self.now = now
+
+    def __call__(self):
+        """Возвращает текущее виртуальное время."""
+        return self.now
+
+    def advance(self, seconds):
+        """Переводит часы вперёд.
+
+        Часы встают чуть позже now + seconds: иначе при времени порядка
+        эпохи Unix округление оставляет таймер цикла событий несработавшим.
+        """
+        self.now = math.nextafter(self.now + seconds, math.inf)
+
+
+class VirtualSelector(selectors.DefaultSelector):
+    """Селектор, который вместо ожидания переводит виртуальные часы."""
+
+    def __init__(self, clock):
+        """Создаёт селектор поверх часов clock."""
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout=None):
+        """Опрашивает дескрипторы без ожидания и сдвигает часы на timeout."""
+        events = super().select(None if timeout is None else 0)
+        if not events and timeout:
+            self.clock.advance(timeout)
+        return events
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    """Цикл событий, в котором sleep и таймауты не ждут реального времени."""
+
+    def __init__(self, clock):
+        """Создаёт цикл на виртуальных часах clock."""
+        self.clock = clock
+        super().__init__(VirtualSelector(clock))
+
+    def time(self):
+        """Возвращает виртуальное время."""
+        return self.clock()
+
+
+class InlineExecutor(Executor):
+    """Исполнитель, выполняющий задачи сразу в вызывающем потоке.
+
+    Движок вызывает функции такого исполнителя напрямую, без Future.
+    """
+
+    inline = True
+
+    def submit(self, fn, /, *args, **kwargs):
+        """Выполняет fn и возвращает завершённый Future."""
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as error:
+            future.set_exception(error)
+        return future
+
+
+class ReplaySender:
+    """Вместо отправки в Telegram считает задержку уведомлений."""
+
+    def __init__(self, trace, clock):
+        """Создаёт приёмник уведомлений для трассы."""
+        self.trace = trace
+        self.clock = clock
+        self.polls = 0
+        self.messages = 0
+        self.latencies = []
+
+    def submit(self, chat_id, message, outbox_id=None):
+        """Запоминает задержку от смены статуса до уведомления."""
+        self.messages += 1
+        published = self.trace.published.get((chat_id, message))
+        if published is not None:
+            self.latencies.append(self.clock() - published)
+
+    def submit_many(self, messages):
+        """Запоминает задержки тройки (chat_id, текст, id в outbox)."""
+        for chat_id, message, outbox_id in messages:
+            self.submit(chat_id, message, outbox_id)
+
+    def start(self):
+        """Ничего не делает: отправлять нечего."""
+
+    def stop(self, timeout=None):
+        """Ничего не делает: отправлять нечего."""
+
+
+def replay(trace, scheduler=None, seed=0):
+    """Прогоняет движок по трассе в виртуальном времени.
+
+    Возвращает число опросов и уведомлений и задержки уведомлений.
+    """
+    from engine import Engine, Tenant
+    from scheduler import Scheduler
+
+    clock = VirtualClock(trace.start)
+    if scheduler is None:
+        scheduler = Scheduler(rand=random.Random(seed).random)
+    sender = ReplaySender(trace, clock)
+
+    def fetch(url, current_timestamp, headers):
+        sender.polls += 1
+        tenant_id = headers['Authorization'].partition(' ')[2]
+        return trace.answer(tenant_id, current_timestamp, clock())
+
+    engine = Engine(
+        None, scheduler=scheduler, streaming=False, sender=sender,
+        clock=clock, fetch=fetch, executor=InlineExecutor()
+    )
+    for tenant_id in trace.tenants:
+        engine.add_tenant(
+            Tenant(tenant_id, tenant_id, current_date=int(trace.start))
+        )
+
+    async def runner():
+        task = asyncio.create_task(engine.run())
+        await asyncio.sleep(trace.end - trace.start)
+        engine.stop()
+        await task
+
+    loop = VirtualEventLoop(clock)
+    try:
+        loop.run_until_complete(runner())
+    finally:
+        loop.close()
+    return dict(
+        tenants=len(trace.tenants),
+        simulated_seconds=round(trace.end - trace.start, 3),
+        polls=sender.polls,
+        messages=sender.messages,
+        latencies=sorted(sender.latencies),
+    )
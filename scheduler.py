@@ -0,0 +1,49 @@
+import math
+import random
+
+REVIEWING_INTERVAL = 60
+REJECTED_INTERVAL = 300
+APPROVED_INTERVAL = 900
+IDLE_INTERVAL = 600
+BACKOFF_BASE = 30
+BACKOFF_MAX = 3600
+
+STATUS_INTERVALS = {
+    'reviewing': REVIEWING_INTERVAL,
+    'rejected': REJECTED_INTERVAL,
+    'approved': APPROVED_INTERVAL,
+}
+
+
+class Scheduler:
+    """Вычисляет момент следующего опроса по статусу и числу сбоев."""
+
+    def __init__(self, intervals=None, idle=IDLE_INTERVAL,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX,
+                 rand=random.random):
+        """Создаёт планировщик с интервалами для каждого статуса."""
+        self.intervals = dict(STATUS_INTERVALS if intervals is None
+                              else intervals)
+        self.idle = idle
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rand = rand
+
+    def interval(self, status):
+        """Возвращает интервал опроса для последнего статуса работы."""
+        return self.intervals.get(status, self.idle)
+
+    def backoff(self, failures):
+        """Возвращает экспоненциальную задержку с джиттером после сбоев."""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (failures - 1))
+        return delay / 2 + self.rand() * delay / 2
+
+    def next_deadline(self, deadline, now, status=None, failures=0):
+        """Возвращает следующий дедлайн опроса без накопления дрейфа."""
+        if failures:
+            return now + self.backoff(failures)
+        interval = self.interval(status)
+        deadline += interval
+        if deadline <= now:
+            deadline += math.ceil((now - deadline) / interval) * interval
+        return deadline
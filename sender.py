@@ -0,0 +1,321 @@
+from collections import deque
+import heapq
+import logging
+import os
+import threading
+import time
+
+import metrics
+import transport
+
+GLOBAL_RATE = 30
+CHAT_RATE = 1
+MESSAGE_LIMIT = 4096
+MESSAGE_SEPARATOR = '\n\n'
+SEND_ATTEMPTS = 5
+SEND_RETRY_DELAY = 5
+SEND_RETRY_MAX = 60
+SEND_BUDGET = 10
+SEND_WORKERS = int(os.getenv('SEND_WORKERS', 8))
+
+SEND_ERROR = 'Не удалось отправить сообщение в чат {chat_id}: {error}'
+SEND_DROPPED = 'Сообщения в чат {chat_id} отброшены после {attempts} попыток'
+SEND_REJECTED = 'Telegram отклонил сообщения в чат {chat_id}: {error}'
+OUTBOX_ERROR = 'Не удалось отметить отправленные сообщения в outbox: {error}'
+BATCH_ERROR = 'Сбой отправки в чат {chat_id}: {error}'
+
+
+def permanent(error):
+    """Проверяет, что повтор не поможет: Bot API вернул ошибку 4xx."""
+    code = getattr(error, 'code', None)
+    return isinstance(code, int) and 400 <= code < 500 and code != 429
+
+
+class TokenBucket:
+    """Ограничивает частоту событий алгоритмом «ведро токенов»."""
+
+    __slots__ = ('rate', 'capacity', 'clock', 'tokens', 'updated')
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        """Создаёт полное ведро на capacity токенов с пополнением rate/с."""
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def delay(self):
+        """Возвращает время ожидания до появления токена."""
+        self._refill()
+        return max(0, (1 - self.tokens) / self.rate)
+
+    def consume(self):
+        """Забирает один токен."""
+        self._refill()
+        self.tokens -= 1
+
+
+class Sender:
+    """Фоновая очередь отправки в Telegram с ограничением частоты.
+
+    Сообщения, накопившиеся для одного чата, склеиваются в одно.
+    Разные чаты отправляются параллельно из workers потоков, а в один
+    чат одновременно идёт не больше одного запроса, поэтому порядок
+    сообщений чата сохраняется. Сбои повторяются с растущей паузой до
+    SEND_RETRY_MAX секунд. Сообщения из outbox удаляются из него только
+    после отправки или ошибки 4xx (например, чат не найден) и повторяются
+    без ограничения числа попыток; остальные отбрасываются после
+    SEND_ATTEMPTS попыток. Если отметить отправку в outbox не удалось,
+    строки остаются в нём и будут отправлены повторно после перезапуска.
+    """
+
+    def __init__(self, bot, global_rate=GLOBAL_RATE, chat_rate=CHAT_RATE,
+                 clock=time.monotonic, outbox=None, budget=SEND_BUDGET,
+                 workers=SEND_WORKERS):
+        """Создаёт очередь с общим лимитом и лимитом на каждый чат.
+
+        budget - секунды на одну попытку отправки.
+        """
+        self.bot = bot
+        self.outbox = outbox
+        self.budget = budget
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.clock = clock
+        self.global_bucket = TokenBucket(global_rate, clock=clock)
+        self._buckets = {}
+        self._pending = {}
+        self._attempts = {}
+        self._ready = deque()
+        self._delayed = []
+        self._sending = set()
+        self._discarded = set()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._stopping = False
+
+    def _enqueue(self, chat_id, message, outbox_id):
+        if chat_id not in self._pending:
+            self._pending[chat_id] = []
+            if chat_id not in self._sending:
+                self._ready.append(chat_id)
+        self._pending[chat_id].append((message, outbox_id))
+
+    def submit(self, chat_id, message, outbox_id=None):
+        """Ставит сообщение в очередь, не дожидаясь отправки."""
+        with self._condition:
+            self._enqueue(chat_id, message, outbox_id)
+            self._condition.notify()
+
+    def submit_many(self, messages):
+        """Ставит в очередь тройки (chat_id, текст, id в outbox) разом."""
+        with self._condition:
+            for chat_id, message, outbox_id in messages:
+                self._enqueue(chat_id, message, outbox_id)
+            self._condition.notify_all()
+
+    def discard(self, outbox_ids):
+        """Убирает из очереди сообщения с id в outbox из outbox_ids.
+
+        Из outbox они не удаляются: их отправит новый владелец студента.
+        Отправляемые сейчас сообщения после сбоя не повторяются.
+        """
+        outbox_ids = set(outbox_ids)
+        with self._condition:
+            for chat_id in list(self._pending):
+                kept = [item for item in self._pending[chat_id]
+                        if item[1] not in outbox_ids]
+                outbox_ids.difference_update(
+                    item[1] for item in self._pending[chat_id]
+                )
+                if kept:
+                    self._pending[chat_id] = kept
+                else:
+                    del self._pending[chat_id]
+            self._discarded |= outbox_ids
+
+    def set_global_rate(self, rate):
+        """Меняет общий лимит, например при смене числа реплик."""
+        with self._condition:
+            bucket = self.global_bucket
+            bucket.rate = bucket.capacity = rate
+            bucket.tokens = min(bucket.tokens, rate)
+
+    def send_message(self, chat_id, text):
+        """Ставит сообщение в очередь; совместим с telegram.Bot."""
+        self.submit(chat_id, text)
+
+    def start(self):
+        """Запускает фоновые потоки отправки."""
+        self._stopping = False
+        self._threads = [threading.Thread(target=self._run, daemon=True)
+                         for _ in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=None):
+        """Дожидается отправки очереди и останавливает поток.
+
+        С outbox ждать отложенных повторов не нужно: неотправленное
+        будет доставлено после перезапуска.
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _bucket(self, chat_id):
+        if chat_id not in self._buckets:
+            self._buckets[chat_id] = TokenBucket(
+                self.chat_rate, capacity=1, clock=self.clock
+            )
+        return self._buckets[chat_id]
+
+    def _delay(self, chat_id, delay):
+        heapq.heappush(self._delayed, (self.clock() + delay, chat_id))
+
+    def _pick(self):
+        now = self.clock()
+        while self._delayed and self._delayed[0][0] <= now:
+            self._ready.append(heapq.heappop(self._delayed)[1])
+        if not self._ready:
+            return None, self._delayed[0][0] - now if self._delayed else None
+        wait = self.global_bucket.delay()
+        if wait > 0:
+            return None, wait
+        chat_id = self._ready.popleft()
+        if chat_id not in self._pending or chat_id in self._sending:
+            return None, 0
+        wait = self._bucket(chat_id).delay()
+        if wait > 0:
+            self._delay(chat_id, wait)
+            return None, 0
+        self.global_bucket.consume()
+        self._bucket(chat_id).consume()
+        return chat_id, None
+
+    def _coalesce(self, chat_id):
+        messages = self._pending.pop(chat_id)
+        batch = [messages[0]]
+        size = len(messages[0][0])
+        for message in messages[1:]:
+            size += len(MESSAGE_SEPARATOR) + len(message[0])
+            if size > MESSAGE_LIMIT:
+                break
+            batch.append(message)
+        rest = messages[len(batch):]
+        if rest:
+            self._pending[chat_id] = rest
+        self._sending.add(chat_id)
+        return batch
+
+    def _forget(self, batch):
+        if self._discarded:
+            self._discarded.difference_update(
+                outbox_id for _, outbox_id in batch
+            )
+
+    def _requeue(self, chat_id, batch, delay):
+        kept = [item for item in batch if item[1] not in self._discarded]
+        self._forget(batch)
+        if not kept:
+            self._release(chat_id)
+            return
+        self._pending[chat_id] = kept + self._pending.get(chat_id, [])
+        self._sending.discard(chat_id)
+        self._delay(chat_id, delay)
+        self._condition.notify()
+
+    def _release(self, chat_id):
+        self._attempts.pop(chat_id, None)
+        self._sending.discard(chat_id)
+        if chat_id in self._pending:
+            self._ready.append(chat_id)
+            self._condition.notify()
+
+    def _done(self, batch):
+        ids = [outbox_id for _, outbox_id in batch if outbox_id is not None]
+        if self.outbox is None or not ids:
+            return
+        try:
+            self.outbox.done(ids)
+        except Exception as error:
+            logging.error(OUTBOX_ERROR.format(error=error))
+
+    def _retry(self, chat_id, batch, error):
+        """Ставит batch на повтор; False, если сообщения нужно отбросить."""
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            self._requeue(chat_id, batch, retry_after)
+            return True
+        logging.error(SEND_ERROR.format(chat_id=chat_id, error=error))
+        if permanent(error):
+            logging.error(SEND_REJECTED.format(chat_id=chat_id, error=error))
+            return False
+        attempts = self._attempts.get(chat_id, 0) + 1
+        durable = self.outbox is not None and any(
+            outbox_id is not None for _, outbox_id in batch
+        )
+        if not durable and attempts >= SEND_ATTEMPTS:
+            logging.error(SEND_DROPPED.format(
+                chat_id=chat_id, attempts=attempts
+            ))
+            return False
+        self._attempts[chat_id] = attempts
+        self._requeue(chat_id, batch, min(
+            SEND_RETRY_DELAY * 2 ** min(attempts - 1, 16), SEND_RETRY_MAX
+        ))
+        return True
+
+    def _deliver(self, chat_id, batch):
+        started = time.perf_counter()
+        try:
+            with transport.deadline(self.budget):
+                self.bot.send_message(
+                    chat_id, MESSAGE_SEPARATOR.join(text for text, _ in batch)
+                )
+        except Exception as error:
+            metrics.ERRORS.inc('send_message')
+            with self._condition:
+                if self._retry(chat_id, batch, error):
+                    return
+        else:
+            metrics.MESSAGES.inc()
+        finally:
+            metrics.STAGE_SECONDS.observe(
+                time.perf_counter() - started, 'send_message'
+            )
+        try:
+            self._done(batch)
+        finally:
+            with self._condition:
+                self._forget(batch)
+                self._release(chat_id)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                chat_id, wait = self._pick()
+                if chat_id is None:
+                    if self._stopping and (
+                        wait is None or self.outbox is not None
+                    ):
+                        return
+                    if wait != 0:
+                        self._condition.wait(wait)
+                    continue
+                batch = self._coalesce(chat_id)
+            try:
+                self._deliver(chat_id, batch)
+            except Exception as error:
+                logging.error(BATCH_ERROR.format(chat_id=chat_id, error=error))
+                with self._condition:
+                    self._release(chat_id)
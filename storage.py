@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import threading
+import time
+
+STATE_DB = os.getenv('STATE_DB', os.path.splitext(__file__)[0] + '.sqlite3')
+FLUSH_INTERVAL = float(os.getenv('FLUSH_INTERVAL', 5))
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tenants (
+    id TEXT PRIMARY KEY,
+    from_date INTEGER NOT NULL,
+    status TEXT
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tenant_id TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+'''
+UPSERT = '''
+INSERT INTO tenants (id, from_date, status) VALUES (?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    from_date = excluded.from_date,
+    status = excluded.status
+'''
+ENQUEUE = 'INSERT INTO outbox (tenant_id, chat_id, message) VALUES (?, ?, ?)'
+
+
+class Store:
+    """Хранит курсоры и последние статусы студентов в SQLite (WAL).
+
+    Там же лежит очередь исходящих уведомлений (outbox): уведомление
+    записывается в одной транзакции с курсором и удаляется после отправки.
+    """
+
+    def __init__(self, path=STATE_DB, flush_interval=FLUSH_INTERVAL,
+                 clock=time.monotonic):
+        """Открывает базу и создаёт таблицы при первом запуске."""
+        self.connection = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False
+        )
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self._pending = {}
+        self._flushed_at = clock()
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Возвращает сохранённые курсоры и статусы по id студента."""
+        self.flush()
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT id, from_date, status FROM tenants'
+            ).fetchall()
+        return {tenant_id: (current_date, status)
+                for tenant_id, current_date, status in rows}
+
+    def save(self, tenant_id, current_date, status, durable=False,
+             messages=()):
+        """Ставит состояние студента в очередь на запись.
+
+        Состояние с уведомлениями messages (пары chat_id, текст)
+        записывается сразу вместе с ними; возвращаются id уведомлений
+        в outbox. Остальное пишется пачкой не чаще раза в flush_interval
+        секунд. Если запись не удалась, состояние tenant_id забывается,
+        а накопленные состояния других студентов ждут следующей записи.
+        """
+        with self._lock:
+            self._pending[tenant_id] = (current_date, status)
+            if (durable or messages
+                    or self.clock() - self._flushed_at >= self.flush_interval):
+                return self._flush(tenant_id, messages)
+            return []
+
+    def flush(self):
+        """Записывает накопленные состояния одной транзакцией."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self, tenant_id=None, messages=()):
+        self._flushed_at = self.clock()
+        if not self._pending and not messages:
+            return []
+        pending, self._pending = self._pending, {}
+        rows = [(pending_id, current_date, status)
+                for pending_id, (current_date, status) in pending.items()]
+        try:
+            with self.connection:
+                self.connection.execute('BEGIN')
+                self.connection.executemany(UPSERT, rows)
+                return [
+                    self.connection.execute(
+                        ENQUEUE, (tenant_id, str(chat_id), message)
+                    ).lastrowid
+                    for chat_id, message in messages
+                ]
+        except sqlite3.Error:
+            pending.pop(tenant_id, None)
+            self._pending = pending
+            raise
+
+    def outbox(self):
+        """Возвращает неотправленные уведомления, от старых к новым.
+
+        Элементы - кортежи (id, id студента, chat_id, текст).
+        """
+        with self._lock:
+            return self.connection.execute(
+                'SELECT id, tenant_id, chat_id, message FROM outbox '
+                'ORDER BY id'
+            ).fetchall()
+
+    def done(self, ids):
+        """Удаляет отправленные уведомления из outbox."""
+        with self._lock, self.connection:
+            self.connection.execute('BEGIN')
+            self.connection.executemany(
+                'DELETE FROM outbox WHERE id = ?',
+                [(outbox_id,) for outbox_id in ids]
+            )
+
+    def close(self):
+        """Записывает остаток очереди и закрывает базу."""
+        self.flush()
+        self.connection.close()
@@ -0,0 +1,103 @@
+import codecs
+import json
+
+CHUNK_SIZE = 16 * 1024
+ARRAY_KEY = 'homeworks'
+WHITESPACE = ' \t\n\r'
+
+UNEXPECTED_CHAR = 'Некорректный JSON: ожидался {expected}, получен {char!r}'
+UNEXPECTED_END = 'Ответ API оборвался до конца JSON'
+
+DECODER = json.JSONDecoder()
+
+
+class HomeworkStream:
+    """Разбирает JSON-объект ответа API по частям.
+
+    Элементы массива homeworks отдаются по одному по мере чтения,
+    остальные поля верхнего уровня складываются в fields. В памяти
+    держится только ещё не разобранный хвост потока.
+    """
+
+    def __init__(self, chunks, key=ARRAY_KEY):
+        """Создаёт разборщик над итератором байтовых частей ответа."""
+        self.chunks = iter(chunks)
+        self.key = key
+        self.fields = {}
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._position = 0
+        self._eof = False
+
+    def _more(self):
+        if self._eof:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self._eof = True
+            text = self._decoder.decode(b'', final=True)
+        else:
+            text = self._decoder.decode(chunk)
+        self._buffer = self._buffer[self._position:] + text
+        self._position = 0
+        return True
+
+    def _peek(self):
+        while True:
+            buffer = self._buffer
+            while (self._position < len(buffer)
+                   and buffer[self._position] in WHITESPACE):
+                self._position += 1
+            if self._position < len(buffer):
+                return buffer[self._position]
+            if not self._more():
+                raise ValueError(UNEXPECTED_END)
+
+    def _next_char(self, *expected):
+        char = self._peek()
+        if char not in expected:
+            raise ValueError(UNEXPECTED_CHAR.format(
+                expected=' или '.join(expected), char=char
+            ))
+        self._position += 1
+        return char
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if self._more():
+                    continue
+                raise
+            if end == len(self._buffer) and self._more():
+                continue
+            self._position = end
+            return value
+
+    def _array(self):
+        self._next_char('[')
+        if self._peek() == ']':
+            self._position += 1
+            return
+        while True:
+            yield self._value()
+            if self._next_char(',', ']') == ']':
+                return
+
+    def __iter__(self):
+        """Отдаёт работы из массива по одной."""
+        self._next_char('{')
+        if self._peek() == '}':
+            self._position += 1
+            return
+        while True:
+            key = self._value()
+            self._next_char(':')
+            if key == self.key:
+                yield from self._array()
+            else:
+                self.fields[key] = self._value()
+            if self._next_char(',', '}') == '}':
+                return
@@ -0,0 +1,70 @@
+import json
+import os
+
+import homework
+
+SUBSCRIPTIONS_FILE = os.getenv('SUBSCRIPTIONS_FILE')
+
+NO_TARGET = 'Подписка чата {chat_id} не указывает ни студента, ни работу'
+
+
+class Subscriptions:
+    """Индекс подписок: какие ещё чаты получают уведомления.
+
+    Чат подписывается на все работы студента (наставник, группа
+    когорты) или на одну работу по её ключу HomeworkIndex.key. Поиск
+    получателей стоит два обращения к словарям при любом числе подписок.
+    """
+
+    def __init__(self):
+        """Создаёт пустой индекс."""
+        self.tenants = {}
+        self.homeworks = {}
+
+    def add(self, chat_id, tenant=None, homework_key=None):
+        """Подписывает чат на студента или на работу."""
+        if tenant is None and homework_key is None:
+            raise ValueError(NO_TARGET.format(chat_id=chat_id))
+        chat_id = str(chat_id)
+        if tenant is not None:
+            self.tenants[str(tenant)] = (
+                self.tenants.get(str(tenant), frozenset()) | {chat_id}
+            )
+        if homework_key is not None:
+            self.homeworks[homework_key] = (
+                self.homeworks.get(homework_key, frozenset()) | {chat_id}
+            )
+
+    def recipients(self, tenant, homework_data):
+        """Возвращает чаты для уведомления о работе студента.
+
+        Чат самого студента всегда первый, остальные - без повторов.
+        """
+        if not self.tenants and not self.homeworks:
+            return [tenant.chat_id]
+        own = str(tenant.chat_id)
+        extra = (
+            self.tenants.get(tenant.id, frozenset())
+            | self.homeworks.get(
+                homework.HomeworkIndex.key(homework_data), frozenset()
+            )
+        )
+        return [tenant.chat_id, *sorted(extra - {own})]
+
+    @classmethod
+    def load(cls, path):
+        """Читает подписки из файла JSON Lines.
+
+        Строка - объект с chat_id и полем tenant и/или homework.
+        """
+        subscriptions = cls()
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                subscriptions.add(
+                    record['chat_id'], record.get('tenant'),
+                    record.get('homework')
+                )
+        return subscriptions
@@ -0,0 +1,118 @@
+import logging
+import multiprocessing
+import os
+import signal
+import time
+
+from engine import TenantsFile, run_engine
+import homework
+from leases import LEASES, REPLICA_ID
+from logs import setup_logging
+import metrics
+from profiling import PROFILE_SIGNAL
+
+RESTART_DELAY = 5
+CHECK_INTERVAL = 1
+
+WORKER_STARTED = 'Запущен воркер {shard} (pid {pid})'
+WORKER_DIED = 'Воркер {shard} завершился с кодом {code}, перезапуск'
+
+
+def run_worker(shard, shards):
+    """Процесс-воркер: опрашивает студентов своего шарда.
+
+    При LEASES=1 студентов делят аренды партиций, а не шарды; каждый
+    воркер арендует партиции как отдельная реплика REPLICA_ID-w<шард>,
+    где REPLICA_ID - идентификатор супервизора.
+    """
+    setup_logging(f'{homework.__file__}.worker{shard}.log')
+    if metrics.METRICS_PORT is not None:
+        metrics.start_server(port=int(metrics.METRICS_PORT) + 1 + shard)
+    if LEASES:
+        source = TenantsFile(homework.TENANTS_FILE)
+    else:
+        source = TenantsFile(homework.TENANTS_FILE, shard, shards)
+    run_engine(
+        source.load(), homework.make_bot(), source=source, shards=shards,
+        commands=False, replica=f'{REPLICA_ID}-w{shard}'
+    )
+
+
+class Supervisor:
+    """Держит запущенными воркеры, каждый со своим шардом студентов."""
+
+    def __init__(self, workers=homework.WORKERS, target=run_worker,
+                 restart_delay=RESTART_DELAY, clock=time.monotonic):
+        """Готовит воркеры; процессы запускаются в run() или start()."""
+        self.workers = workers
+        self.target = target
+        self.restart_delay = restart_delay
+        self.clock = clock
+        self.processes = [None] * workers
+        self.started_at = [None] * workers
+        self._context = multiprocessing.get_context('spawn')
+        self._running = False
+
+    def _spawn(self, shard):
+        process = self._context.Process(
+            target=self.target, args=(shard, self.workers), daemon=True
+        )
+        process.start()
+        self.processes[shard] = process
+        self.started_at[shard] = self.clock()
+        logging.info(WORKER_STARTED.format(shard=shard, pid=process.pid))
+
+    def start(self):
+        """Запускает все воркеры.
+
+        Воркеры наследуют REPLICA_ID супервизора: без этого каждый
+        процесс выводил бы его из своего pid, и перезапущенный воркер
+        входил бы в аренду новой репликой.
+        """
+        os.environ.setdefault('REPLICA_ID', REPLICA_ID)
+        self._running = True
+        for shard in range(self.workers):
+            self._spawn(shard)
+
+    def check(self):
+        """Перезапускает упавшие воркеры, не чаще раза в restart_delay."""
+        for shard, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            if self.clock() - self.started_at[shard] < self.restart_delay:
+                continue
+            logging.error(WORKER_DIED.format(
+                shard=shard, code=process.exitcode
+            ))
+            self._spawn(shard)
+
+    def stop(self, *args):
+        """Останавливает воркеры."""
+        self._running = False
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            if process is not None:
+                process.join()
+
+    def forward(self, signum, frame=None):
+        """Передаёт сигнал всем живым воркерам."""
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                os.kill(process.pid, signum)
+
+    def run(self):
+        """Запускает воркеры и следит за ними до сигнала остановки.
+
+        Сигнал профилирования передаётся воркерам.
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(PROFILE_SIGNAL, self.forward)
+        self.start()
+        try:
+            while self._running:
+                self.check()
+                time.sleep(CHECK_INTERVAL)
+        finally:
+            self.stop()
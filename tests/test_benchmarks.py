@@ -0,0 +1,59 @@
+from benchmarks.bench_bot import percentile, run
+from benchmarks.bench_fanout import deliver
+from benchmarks.bench_history import measure as measure_history
+from benchmarks.bench_history import synthesize as synthesize_history
+from benchmarks.bench_json import measure as measure_json
+from benchmarks.bench_memory import measure as measure_memory
+from benchmarks.bench_startup import run as run_startup
+from history import History
+
+
+class TestBenchmark:
+
+    def test_percentile(self):
+        values = list(range(100))
+        assert percentile(values, 0.5) == 50
+        assert percentile(values, 0.99) == 99
+        assert percentile([3], 0.95) == 3
+
+    def test_smoke(self):
+        report = run(
+            tenants=5, duration=1, interval=0.2, change_interval=0.3,
+            api_latency=0, telegram_latency=0, telegram_rate=1000
+        )
+        assert report['api_requests'] >= 5, (
+            'Каждый студент должен опрашиваться заглушкой API'
+        )
+        assert report['notified'] > 0, (
+            'Уведомления должны доходить до заглушки Telegram'
+        )
+        assert report['latency_p50'] >= 0
+
+    def test_startup(self):
+        report = run_startup(repeat=1, targets={'homework': ['homework']})
+        assert report['homework']['import_ms'] > 0
+
+    def test_memory_per_tenant(self):
+        assert measure_memory(2000) < 1024, (
+            'Простаивающий студент должен занимать меньше килобайта'
+        )
+
+    def test_json_decoders(self):
+        report = measure_json(homeworks=20, repeat=1)
+        assert report['gzip_bytes'] < report['bytes'], (
+            'Ответ API должен хорошо сжиматься'
+        )
+        assert report['json_us'] > 0
+
+    def test_history_report(self, tmp_path):
+        history = History(tmp_path)
+        events = synthesize_history(history, events=20_000, tenants=100)
+        report, elapsed = measure_history(history, repeat=1)
+        assert report['events'] == events
+        assert 0.2 < report['reject_rate'] < 0.4
+        assert elapsed < 1
+
+    def test_fanout(self):
+        assert deliver(8, workers=8, latency=0.05) < deliver(
+            8, workers=1, latency=0.05
+        ), 'Рассылка нескольким чатам должна идти параллельно'
@@ -1,7 +1,7 @@
 from http import HTTPStatus
 
-import requests
 import telegram
+import transport
 import utils
 import os
 
@@ -44,6 +44,7 @@ class MockResponseGET:
         )
         self.random_timestamp = random_timestamp
         self.status_code = http_status
+        self.headers = {}
 
     def json(self):
         data = {
@@ -126,7 +127,7 @@ class TestHomework:
                 current_timestamp=current_timestamp, **kwargs
             )
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        monkeypatch.setattr(transport.SESSION, 'get', mock_response_get)
 
         import homework
 
@@ -172,7 +173,7 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_500_response_get)
+        monkeypatch.setattr(transport.SESSION, 'get', mock_500_response_get)
 
         import homework
 
@@ -255,7 +256,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        monkeypatch.setattr(transport.SESSION, 'get', mock_response_get)
 
         import homework
 
@@ -292,7 +293,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        monkeypatch.setattr(transport.SESSION, 'get', mock_response_get)
 
         import homework
 
@@ -325,7 +326,7 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_no_homeworks_response_get)
+        monkeypatch.setattr(transport.SESSION, 'get', mock_no_homeworks_response_get)
 
         import homework
 
@@ -358,7 +359,7 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_empty_response_get)
+        monkeypatch.setattr(transport.SESSION, 'get', mock_empty_response_get)
 
         import homework
 
@@ -384,7 +385,7 @@ class TestHomework:
             )
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        monkeypatch.setattr(transport.SESSION, 'get', mock_response_get)
 
         import homework
 
@@ -397,3 +398,44 @@ class TestHomework:
             f'Убедитесь, что в функции `{func_name}` обрабатываете ситуацию, '
             'когда API возвращает код, отличный от 200'
         )
+
+    def test_check_response_all_homeworks(self):
+        import homework
+
+        homeworks = [
+            {'homework_name': 'hw2', 'status': 'reviewing'},
+            {'homework_name': 'hw1', 'status': 'approved'},
+        ]
+        result = homework.check_response({'homeworks': homeworks})
+        assert result == homeworks, (
+            'Проверьте, что функция `check_response` возвращает '
+            'все работы из ответа API'
+        )
+        assert homework.check_response({'homeworks': []}) == []
+        try:
+            homework.check_response({'homeworks': {'status': 'approved'}})
+        except TypeError:
+            pass
+        else:
+            assert False, (
+                'Убедитесь, что функция `check_response` проверяет, '
+                'что работы приходят списком'
+            )
+
+    def test_homework_index(self):
+        import homework
+
+        index = homework.HomeworkIndex()
+        first = {'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'}
+        second = {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'}
+        changes = index.changes([second, first])
+        assert changes == [first, second], (
+            'Изменения должны возвращаться от старых работ к новым'
+        )
+        for current in changes:
+            index.remember(current)
+        assert index.changes([second, first]) == [], (
+            'Повторный статус не должен считаться изменением'
+        )
+        approved = dict(first, status='approved')
+        assert index.changes([second, approved]) == [approved]
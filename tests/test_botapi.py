@@ -0,0 +1,68 @@
+import subprocess
+import sys
+
+import pytest
+
+from botapi import Bot, BotError
+from tests.conftest import root_dir
+
+
+class MockResponse:
+
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+
+    def json(self):
+        if self.data is None:
+            raise ValueError('not json')
+        return self.data
+
+
+class MockSession:
+
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+
+    def post(self, url, json, timeout):
+        self.calls.append((url, json))
+        return self.response
+
+
+class TestBot:
+
+    def test_send_message(self):
+        session = MockSession(MockResponse({'ok': True, 'result': {'id': 1}}))
+        bot = Bot('123:abc', base_url='http://bot/bot', session=session)
+        assert bot.send_message(42, 'привет') == {'id': 1}
+        assert session.calls == [
+            ('http://bot/bot123:abc/sendMessage',
+             {'chat_id': 42, 'text': 'привет'})
+        ], 'Проверьте адрес метода и параметры sendMessage'
+
+    def test_errors(self):
+        session = MockSession(MockResponse({
+            'ok': False, 'error_code': 429, 'description': 'Too Many Requests',
+            'parameters': {'retry_after': 3},
+        }, status_code=429))
+        with pytest.raises(BotError) as error:
+            Bot('token', session=session).send_message(1, 'текст')
+        assert error.value.retry_after == 3, (
+            'Пауза из ответа 429 нужна очереди отправки для повтора'
+        )
+        session = MockSession(MockResponse(None, status_code=502))
+        with pytest.raises(BotError) as error:
+            Bot('token', session=session).send_message(1, 'текст')
+        assert error.value.code == 502
+        assert error.value.retry_after is None
+
+    def test_telegram_is_not_imported(self):
+        output = subprocess.run(
+            [sys.executable, '-c',
+             'import sys, homework; print("telegram" in sys.modules)'],
+            cwd=root_dir, capture_output=True, check=True, text=True
+        ).stdout
+        assert output.strip() == 'False', (
+            'python-telegram-bot не должен загружаться при старте бота'
+        )
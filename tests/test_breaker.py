@@ -0,0 +1,119 @@
+from http import HTTPStatus
+
+import pytest
+import requests
+
+from breaker import (CLOSED, HALF_OPEN, OPEN, Breakers, CircuitBreaker,
+                     CircuitOpenError)
+import homework
+import transport
+
+
+class MockResponse:
+
+    def __init__(self, status_code=HTTPStatus.OK):
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return {'homeworks': [], 'current_date': 1}
+
+
+class MockRequest:
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return MockResponse(outcome)
+
+
+class TestCircuitBreaker:
+
+    def test_opens_and_fails_fast(self):
+        breaker = CircuitBreaker('api', failure_threshold=2, clock=lambda: 0)
+        request = MockRequest(
+            HTTPStatus.INTERNAL_SERVER_ERROR,
+            requests.exceptions.ConnectionError('нет связи'),
+        )
+        breaker.call(request)
+        with pytest.raises(requests.exceptions.ConnectionError):
+            breaker.call(request)
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError) as error:
+            breaker.call(request)
+        assert error.value.retry_after == breaker.reset_timeout, (
+            'Ошибка должна сообщать, когда повторить запрос'
+        )
+        assert request.calls == 2, (
+            'При разомкнутом предохранителе запрос не должен уходить в сеть'
+        )
+
+    def test_client_errors_are_not_failures(self):
+        breaker = CircuitBreaker('api', failure_threshold=1)
+        breaker.call(MockRequest(HTTPStatus.UNAUTHORIZED))
+        breaker.call(MockRequest(HTTPStatus.TOO_MANY_REQUESTS))
+        assert breaker.state == CLOSED, (
+            'Ошибки одного студента не должны размыкать общий предохранитель'
+        )
+
+    def test_single_probe_after_timeout(self):
+        now = [0]
+        breaker = CircuitBreaker(
+            'api', failure_threshold=1, reset_timeout=30,
+            clock=lambda: now[0]
+        )
+        breaker.failure()
+        now[0] = 30
+        assert breaker.allow()
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow(), 'Пробный запрос должен быть один'
+        breaker.failure()
+        assert breaker.state == OPEN
+        now[0] = 59
+        assert not breaker.allow()
+        now[0] = 60
+        assert breaker.allow()
+        breaker.success()
+        assert breaker.state == CLOSED
+        assert breaker.allow()
+
+    def test_lost_probe_is_replaced(self):
+        now = [0]
+        breaker = CircuitBreaker(
+            'api', failure_threshold=1, reset_timeout=30,
+            clock=lambda: now[0]
+        )
+        breaker.failure()
+        now[0] = 30
+        assert breaker.allow()
+        now[0] = 60
+        assert breaker.allow(), (
+            'Зависший пробный запрос не должен блокировать восстановление'
+        )
+
+
+class TestBreakers:
+
+    def test_shared_per_host(self, monkeypatch, api_url):
+        breakers = Breakers(failure_threshold=1)
+        assert breakers.get(api_url) is breakers.get(api_url + '?from_date=1')
+        assert breakers.get(api_url) is not breakers.get(
+            'https://api.telegram.org/bot1/sendMessage'
+        )
+        monkeypatch.setattr(transport, 'BREAKERS', breakers)
+        request = MockRequest(HTTPStatus.BAD_GATEWAY)
+        monkeypatch.setattr(transport.SESSION, 'get', request)
+        for token in ('a', 'b'):
+            with pytest.raises(Exception):
+                homework.fetch_api_answer(
+                    api_url, 0, homework.make_headers(token)
+                )
+        assert request.calls == 1, (
+            'Предохранитель должен быть общим для всех студентов'
+        )
@@ -0,0 +1,58 @@
+import pytest
+import requests
+
+import codec
+import transport
+
+
+def make_response(body):
+    response = requests.Response()
+    response._content = body
+    response.status_code = 200
+    return response
+
+
+class TestCodec:
+
+    def test_fastest_decoder_first(self):
+        name, loads = codec.decoder()
+        assert name == codec.available()[0]
+        assert codec.available()[-1] == 'json', (
+            'Стандартный json - запасной декодер'
+        )
+        assert loads('{"a": [1, "б"]}'.encode()) == {'a': [1, 'б']}
+
+    def test_decoder_loaded_lazily(self, monkeypatch):
+        monkeypatch.setattr(codec, 'JSON_DECODER', 'json')
+        monkeypatch.setattr(codec, 'NAME', None)
+        monkeypatch.setattr(codec, '_loads', None)
+        assert codec.loads(b'[1]') == [1]
+        assert codec.NAME == 'json'
+        assert codec.loads(b'[2]') == [2]
+
+    def test_unknown_decoder(self):
+        with pytest.raises(ValueError):
+            codec.decoder('simdjson-nope')
+
+    def test_session_uses_codec(self, monkeypatch):
+        calls = []
+
+        def mock_loads(body):
+            calls.append(body)
+            return {'homeworks': []}
+
+        monkeypatch.setattr(codec, 'loads', mock_loads)
+        session = transport.make_session()
+        assert transport.use_codec in session.hooks['response']
+        response = transport.use_codec(make_response(b'{"homeworks": []}'))
+        assert response.json() == {'homeworks': []}
+        assert calls == [b'{"homeworks": []}'], (
+            'Ответ сессии должен разбираться через codec.loads'
+        )
+
+    @pytest.mark.parametrize('name', codec.available())
+    def test_invalid_json(self, monkeypatch, name):
+        monkeypatch.setattr(codec, 'loads', codec.decoder(name)[1])
+        response = transport.use_codec(make_response(b'<html>502</html>'))
+        with pytest.raises(transport.JSONDecodeError):
+            response.json()
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import homework
+from commands import (COMMAND_FAILED, NO_HOMEWORKS, UNKNOWN_CHAT, Commands,
+                      ResponseCache, SingleFlight)
+from engine import Tenant
+import transport
+
+HOMEWORKS = [
+    {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'},
+    {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+]
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_are_coalesced(self):
+        flight = SingleFlight()
+        calls = []
+        started = threading.Event()
+
+        def slow():
+            calls.append(1)
+            started.set()
+            time.sleep(0.1)
+            return 42
+
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(flight.do('key', slow))
+        ) for _ in range(10)]
+        threads[0].start()
+        started.wait(1)
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [42] * 10
+        assert len(calls) == 1, 'Одновременные вызовы должны объединяться'
+
+
+class TestResponseCache:
+
+    def test_ttl_and_invalidation(self, monkeypatch, api_url):
+        requested = []
+
+        def mock_fetch(url, current_timestamp, headers):
+            requested.append(current_timestamp)
+            return {'homeworks': HOMEWORKS, 'current_date': 1}
+
+        monkeypatch.setattr(homework, 'fetch_api_answer', mock_fetch)
+        now = [0]
+        cache = ResponseCache(api_url, ttl=60, clock=lambda: now[0])
+        tenant = Tenant('token', '1')
+
+        assert cache.get(tenant) == HOMEWORKS
+        assert cache.get(tenant) == HOMEWORKS
+        assert requested == [0], 'Повторный запрос должен браться из кэша'
+        now[0] = 61
+        cache.get(tenant)
+        cache.invalidate(tenant.id)
+        cache.get(tenant)
+        assert len(requested) == 3
+
+    def test_not_modified_keeps_entry(self, monkeypatch, api_url):
+        answers = [{'homeworks': HOMEWORKS}, None]
+        monkeypatch.setattr(
+            homework, 'fetch_api_answer', lambda *args: answers.pop(0)
+        )
+        now = [0]
+        cache = ResponseCache(api_url, ttl=60, clock=lambda: now[0])
+        tenant = Tenant('token', '1')
+        cache.get(tenant)
+        now[0] = 61
+        assert cache.get(tenant) == HOMEWORKS
+
+
+    def test_not_modified_without_entry(self, monkeypatch, api_url):
+        answers = [None, {'homeworks': HOMEWORKS}]
+        conditional = []
+        monkeypatch.setattr(
+            homework, 'fetch_api_answer', lambda *args: answers.pop(0)
+        )
+        monkeypatch.setattr(
+            transport.CACHE, 'forget',
+            lambda *args: conditional.append(args)
+        )
+        cache = ResponseCache(api_url, ttl=60)
+        assert cache.get(Tenant('token', '1')) == HOMEWORKS, (
+            'Ответ 304 без закэшированной истории нужно перезапросить'
+        )
+        assert conditional == [
+            (api_url, {'Authorization': 'OAuth token'}, {'from_date': 0})
+        ]
+
+
+class MockCache:
+
+    def __init__(self, homeworks=None, error=None):
+        self.homeworks = homeworks
+        self.error = error
+
+    def get(self, tenant):
+        if self.error:
+            raise self.error
+        return self.homeworks
+
+
+class TestCommands:
+
+    def test_replies(self):
+        commands = Commands([Tenant('token', 1)], MockCache(HOMEWORKS))
+        assert commands.reply('status', 1) == (
+            'Статус работы "hw2": Работа взята на проверку ревьюером.'
+        )
+        assert commands.reply('history', '1').splitlines() == [
+            'Статус работы "hw2": Работа взята на проверку ревьюером.',
+            'Статус работы "hw1": Работа проверена: ревьюеру всё '
+            'понравилось. Ура!',
+        ]
+        assert commands.reply('status', 2) == UNKNOWN_CHAT
+
+    def test_empty_and_failed(self):
+        tenants = [Tenant('token', 1)]
+        assert Commands(tenants, MockCache([])).reply(
+            'status', 1
+        ) == NO_HOMEWORKS
+        assert Commands(
+            tenants, MockCache(error=ConnectionError('нет ответа'))
+        ).reply('status', 1) == COMMAND_FAILED
@@ -0,0 +1,224 @@
+import asyncio
+from http import HTTPStatus
+import json
+import threading
+import time
+
+import homework
+from engine import Engine, Tenant, load_tenants
+from scheduler import Scheduler
+import transport
+
+
+class MockBot:
+
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, chat_id, text):
+        self.messages.append((chat_id, text))
+
+
+class StreamResponse:
+
+    def __init__(self, status_code, body, headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def iter_content(self, chunk_size):
+        for position in range(0, len(self.body), chunk_size):
+            yield self.body[position:position + chunk_size]
+
+
+def run_engine_for(engine, seconds):
+    async def runner():
+        task = asyncio.create_task(engine.run())
+        await asyncio.sleep(seconds)
+        engine.stop()
+        await task
+
+    asyncio.run(runner())
+
+
+class TestEngine:
+
+    def test_load_tenants(self, tmp_path):
+        path = tmp_path / 'tenants.jsonl'
+        path.write_text(
+            '{"token": "a", "chat_id": "1"}\n\n'
+            '{"token": "b", "chat_id": "2", "id": "bob", "current_date": 5}\n',
+            encoding='utf-8'
+        )
+        tenants = load_tenants(path)
+        assert [tenant.id for tenant in tenants] == ['1', 'bob'], (
+            'Проверьте, что идентификатор студента по умолчанию - его чат'
+        )
+        assert tenants[1].current_date == 5
+        assert tenants[0].headers == {'Authorization': 'OAuth a'}
+
+    def test_tenants_polled_independently(self, monkeypatch):
+        def mock_fetch(url, current_timestamp, headers):
+            if headers['Authorization'] == 'OAuth broken':
+                raise ConnectionError('нет ответа')
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': current_timestamp + 1
+            }
+
+        monkeypatch.setattr(homework, 'fetch_api_answer', mock_fetch)
+        bot = MockBot()
+        engine = Engine(bot, concurrency=2, scheduler=Scheduler(idle=60))
+        good = Tenant('good', '1', current_date=10)
+        broken = Tenant('broken', '2', current_date=10)
+        engine.add_tenant(broken)
+        engine.add_tenant(good)
+        run_engine_for(engine, 0.2)
+
+        assert bot.messages == [('1', homework.parse_status(
+            {'homework_name': 'hw', 'status': 'approved'}
+        ))], 'Сбой одного студента не должен мешать опросу остальных'
+        assert good.current_date == 11
+        assert broken.current_date == 10
+
+    def test_concurrency_limit(self, monkeypatch):
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def mock_fetch(url, current_timestamp, headers):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.pop()
+            return {'homeworks': [], 'current_date': current_timestamp}
+
+        monkeypatch.setattr(homework, 'fetch_api_answer', mock_fetch)
+        engine = Engine(MockBot(), concurrency=3, scheduler=Scheduler(idle=60))
+        for number in range(12):
+            engine.add_tenant(Tenant(str(number), str(number)))
+        run_engine_for(engine, 0.3)
+
+        assert len(peak) == 12, 'Каждый студент должен быть опрошен'
+        assert max(peak) <= 3, 'Превышен лимит одновременных запросов'
+
+    def test_backfill_is_streamed(self, monkeypatch):
+        def mock_iter(url, current_timestamp, headers, fields):
+            fields['current_date'] = 50
+            yield {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'}
+            yield {'id': 1, 'homework_name': 'hw1', 'status': 'approved'}
+
+        def mock_fetch(*args):
+            assert False, 'При from_date=0 ответ нужно читать потоком'
+
+        monkeypatch.setattr(homework, 'iter_api_answer', mock_iter)
+        monkeypatch.setattr(homework, 'fetch_api_answer', mock_fetch)
+        bot = MockBot()
+        engine = Engine(bot, scheduler=Scheduler(idle=60))
+        tenant = Tenant('token', '1', current_date=0)
+        engine.add_tenant(tenant)
+        run_engine_for(engine, 0.2)
+
+        assert tenant.current_date == 50
+        assert tenant.status == 'reviewing', (
+            'Статус студента - статус самой свежей работы'
+        )
+        assert bot.messages == [], (
+            'О прошлых статусах при from_date=0 уведомлять не нужно'
+        )
+        assert not tenant.index.changed(
+            {'id': 1, 'homework_name': 'hw1', 'status': 'approved'}
+        ), 'Статусы всей истории нужно запомнить'
+
+    def test_backfill_is_unconditional(self, monkeypatch):
+        body = json.dumps({
+            'homeworks': [
+                {'id': 1, 'homework_name': 'hw1', 'status': 'approved'}
+            ],
+            'current_date': 50,
+        }).encode()
+        sent = []
+
+        def mock_get(url, headers, params, timeout, stream=False):
+            sent.append(headers)
+            if 'If-None-Match' in headers:
+                return StreamResponse(HTTPStatus.NOT_MODIFIED, b'')
+            return StreamResponse(HTTPStatus.OK, body)
+
+        cache = transport.ConditionalCache()
+        monkeypatch.setattr(transport, 'CACHE', cache)
+        monkeypatch.setattr(transport.SESSION, 'get', mock_get)
+        tenant = Tenant('token', '1', current_date=0)
+        cache.remember(
+            homework.ENDPOINT, tenant.headers, {'from_date': 0},
+            StreamResponse(HTTPStatus.OK, b'', {'ETag': '"status"'})
+        )
+        engine = Engine(None, scheduler=Scheduler(idle=60))
+        asyncio.run(engine.poll(tenant))
+
+        assert 'If-None-Match' not in sent[0], (
+            'Загрузка всей истории не должна быть условной'
+        )
+        assert tenant.current_date == 50
+        assert not tenant.index.changed(
+            {'id': 1, 'homework_name': 'hw1', 'status': 'approved'}
+        )
+
+    def test_streamed_changes_oldest_first(self, monkeypatch):
+        def mock_iter(url, current_timestamp, headers, fields):
+            fields['current_date'] = 50
+            yield {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'}
+            yield {'id': 1, 'homework_name': 'hw1', 'status': 'approved'}
+
+        monkeypatch.setattr(homework, 'iter_api_answer', mock_iter)
+        bot = MockBot()
+        engine = Engine(bot, scheduler=Scheduler(idle=60), streaming=True)
+        tenant = Tenant('token', '1', current_date=10)
+        engine.add_tenant(tenant)
+        run_engine_for(engine, 0.2)
+
+        text = ''.join(message for _, message in bot.messages)
+        assert text.index('hw1') < text.index('hw2'), (
+            'Уведомления идут от старых работ к новым, как без STREAMING'
+        )
+        assert tenant.status == 'reviewing'
+
+    def test_compact_tenant(self):
+        tenant = Tenant('token', 1, status='reviewing')
+        assert not hasattr(tenant, '__dict__'), (
+            'Состояние студента должно храниться в __slots__'
+        )
+        assert tenant.id == '1'
+        assert tenant.status == 'reviewing'
+        tenant.status = None
+        assert tenant.status is None
+        assert tenant._index is None, 'Индекс работ создаётся по требованию'
+        tenant.index.remember({'id': 1, 'homework_name': 'hw',
+                               'status': 'approved'})
+        assert tenant.index.statuses == {
+            1: homework.STATUS_CODES['approved']
+        }
+
+    def test_poll_has_deadline(self, monkeypatch):
+        budgets = []
+
+        def mock_fetch(url, current_timestamp, headers):
+            budgets.append(transport.remaining())
+            return {'homeworks': [], 'current_date': current_timestamp}
+
+        monkeypatch.setattr(homework, 'fetch_api_answer', mock_fetch)
+        engine = Engine(MockBot(), scheduler=Scheduler(idle=60), budget=7)
+        engine.add_tenant(Tenant('token', '1'))
+        run_engine_for(engine, 0.1)
+        assert len(budgets) == 1
+        assert 0 < budgets[0] <= 7, (
+            'Запросы цикла опроса должны укладываться в бюджет'
+        )
@@ -0,0 +1,147 @@
+import math
+import os
+import zlib
+
+import commands
+from commands import NO_STATS, Commands
+from engine import Engine, Tenant
+from history import COLUMNS, HASH_MULTIPLIER, History
+import homework
+from scheduler import Scheduler
+import supervisor
+from tests.test_engine import MockBot, run_engine_for
+
+HOUR = 3600
+
+
+def change(homework_id, status, hours):
+    return {
+        'id': homework_id, 'homework_name': f'hw{homework_id}',
+        'status': status,
+        'date_updated': '2022-01-01T{hours:02d}:00:00Z'.format(hours=hours),
+    }
+
+
+def fill(history):
+    history.record('a', [change(1, 'reviewing', 0)])
+    history.record('a', [change(1, 'rejected', 1), change(2, 'reviewing', 1)])
+    history.record('b', [change(3, 'reviewing', 2)])
+    history.record('a', [change(1, 'reviewing', 5), change(2, 'approved', 3)])
+    history.record('a', [change(1, 'approved', 9)])
+    history.close()
+
+
+class TestHistory:
+
+    def test_report(self, tmp_path):
+        history = History(tmp_path)
+        fill(history)
+        report = history.report()
+        assert report['events'] == 7
+        assert report['verdicts'] == 3
+        assert report['reject_rate'] == 1 / 3
+        assert report['turnaround_p50'] == 2 * HOUR, (
+            'Срок проверки - от reviewing до вердикта той же работы'
+        )
+        mine = history.report('b')
+        assert mine['events'] == 1
+        assert math.isnan(mine['turnaround_p50'])
+
+    def test_segments_and_torn_rows(self, tmp_path):
+        fill(History(tmp_path))
+        extra = History(tmp_path)
+        extra.record('b', [change(3, 'approved', 3)])
+        extra.close()
+        segments = os.listdir(tmp_path)
+        assert len(segments) == 2, 'Каждый журнал пишет свой сегмент'
+        for segment in segments:
+            path = os.path.join(tmp_path, segment, COLUMNS[0][0])
+            with open(path, 'ab') as file:
+                file.write(b'\x01\x02')
+        report = History(tmp_path).report()
+        assert report['events'] == 8, (
+            'Недописанная строка сегмента не должна попадать в отчёт'
+        )
+        assert report['turnaround_p99'] > 0
+
+    def test_hash_collisions_keep_pairs(self, tmp_path):
+        history = History(tmp_path)
+        codes = homework.STATUS_CODES
+        history.write(
+            [1, 0, 1, 0], [0, HASH_MULTIPLIER, 0, HASH_MULTIPLIER],
+            [codes['reviewing'], codes['reviewing'],
+             codes['approved'], codes['approved']],
+            [0, 0, HOUR, 3 * HOUR],
+        )
+        history.close()
+        report = history.report()
+        assert report['turnaround_p50'] == 2 * HOUR, (
+            'Работы с одинаковым хешем не должны терять пары смен статусов'
+        )
+
+    def test_tenants_with_same_crc32_are_apart(self, tmp_path):
+        assert zlib.crc32(b'86821') == zlib.crc32(b'14740600')
+        history = History(tmp_path)
+        history.record('86821', [change(1, 'reviewing', 0)])
+        history.record('14740600', [change(2, 'approved', 1)])
+        history.close()
+        assert history.report('86821')['events'] == 1, (
+            'Статистика разных студентов не должна сливаться'
+        )
+
+    def test_empty(self, tmp_path):
+        report = History(tmp_path / 'missing').report()
+        assert report['events'] == 0
+        assert math.isnan(report['reject_rate'])
+
+    def test_engine_records_changes(self, monkeypatch, tmp_path):
+        def mock_fetch(url, current_timestamp, headers):
+            return {
+                'homeworks': [{'id': 1, 'homework_name': 'hw',
+                               'status': 'approved'}],
+                'current_date': current_timestamp + 1
+            }
+
+        monkeypatch.setattr(homework, 'fetch_api_answer', mock_fetch)
+        history = History(tmp_path, clock=lambda: 100.0)
+        engine = Engine(MockBot(), scheduler=Scheduler(idle=60),
+                        history=history)
+        engine.add_tenant(Tenant('token', '1', current_date=10))
+        run_engine_for(engine, 0.1)
+        history.close()
+        columns = history.columns()
+        assert list(columns['status']) == [homework.STATUS_CODES['approved']]
+        assert list(columns['at']) == [100.0], (
+            'Без date_updated время смены статуса - время опроса'
+        )
+
+    def test_stats_command(self, tmp_path):
+        history = History(tmp_path)
+        tenants = [Tenant('token', 'a'), Tenant('token', 'c')]
+        assert Commands(tenants, None, history).reply('stats', 'a') == (
+            NO_STATS
+        )
+        fill(history)
+        lines = Commands(tenants, None, history).reply('stats', 'a')
+        assert lines.splitlines() == [
+            'Ваши работы: вердиктов 3, возвратов 33%, срок проверки: '
+            'медиана 2.0 ч, p90 3.6 ч, p99 4.0 ч',
+            'Все студенты: вердиктов 3, возвратов 33%, срок проверки: '
+            'медиана 2.0 ч, p90 3.6 ч, p99 4.0 ч',
+        ]
+
+    def test_supervisor_commands_read_history(self, monkeypatch, tmp_path):
+        started = []
+        path = tmp_path / 'tenants.jsonl'
+        path.write_text('{"token": "a", "chat_id": "1"}\n', encoding='utf-8')
+        monkeypatch.setattr(homework, 'COMMANDS', True)
+        monkeypatch.setattr(homework, 'TENANTS_FILE', str(path))
+        monkeypatch.setattr(
+            commands.Commands, 'start',
+            lambda self, token: started.append(self)
+        )
+        monkeypatch.setattr(supervisor.Supervisor, 'run', lambda self: None)
+        homework.supervise()
+        assert started and started[0].history is not None, (
+            'При WORKERS>1 команде /stats нужен журнал воркеров'
+        )
@@ -0,0 +1,199 @@
+import asyncio
+
+from engine import (Engine, LeasedTenants, StaticTenants, Tenant, serve,
+                    shard_of)
+import homework
+from leases import Leases
+from scheduler import Scheduler
+from sender import GLOBAL_RATE, Sender
+from storage import Store
+from tests.test_engine import MockBot
+
+PARTITIONS = 8
+
+
+class Clock:
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_leases(path, replica, clock):
+    return Leases(path, replica, partitions=PARTITIONS, ttl=30, interval=10,
+                  drain=5, clock=clock)
+
+
+class TestLeases:
+
+    def test_replica_joins_and_shares(self, tmp_path):
+        clock = Clock()
+        path = tmp_path / 'state.sqlite3'
+        first = make_leases(path, 'a', clock)
+        assert first.heartbeat() == set(range(PARTITIONS))
+        second = make_leases(path, 'b', clock)
+        assert second.heartbeat() == set(), (
+            'Чужие действующие аренды нельзя забирать'
+        )
+        assert len(first.heartbeat()) == PARTITIONS // 2
+        assert second.heartbeat() == set(), (
+            'Отпущенная партиция выдаётся только после drain'
+        )
+        clock.now += 5
+        assert second.heartbeat() | first.heartbeat() == set(
+            range(PARTITIONS)
+        )
+        assert not second.owned & first.owned
+
+    def test_takeover_after_ttl(self, tmp_path):
+        clock = Clock()
+        path = tmp_path / 'state.sqlite3'
+        first = make_leases(path, 'a', clock)
+        second = make_leases(path, 'b', clock)
+        first.heartbeat()
+        second.heartbeat()
+        clock.now += 5
+        first.heartbeat()
+        second.heartbeat()
+        clock.now += 29
+        assert len(second.heartbeat()) == PARTITIONS // 2, (
+            'Аренды живой реплики ещё действуют'
+        )
+        clock.now += 2
+        assert second.heartbeat() == set(range(PARTITIONS)), (
+            'Партиции упавшей реплики забираются после ttl'
+        )
+
+    def test_release_on_close(self, tmp_path):
+        clock = Clock()
+        path = tmp_path / 'state.sqlite3'
+        first = make_leases(path, 'a', clock)
+        first.heartbeat()
+        first.close()
+        assert make_leases(path, 'b', clock).heartbeat() == set(
+            range(PARTITIONS)
+        )
+
+    def test_lost_database(self, tmp_path):
+        clock = Clock()
+        leases = make_leases(tmp_path / 'state.sqlite3', 'a', clock)
+        leases.heartbeat()
+        leases.connection.close()
+        clock.now += 10
+        assert leases.heartbeat() == set(range(PARTITIONS))
+        clock.now += 10
+        assert leases.heartbeat() == set(), (
+            'Без продления партиции отпускаются до истечения аренды'
+        )
+
+    def test_load_constant(self, tmp_path):
+        clock = Clock()
+        path = tmp_path / 'state.sqlite3'
+        replicas = [make_leases(path, str(number), clock)
+                    for number in range(3)]
+        for _ in range(4):
+            for replica in replicas:
+                replica.heartbeat()
+            clock.now += 10
+        owned = [replica.owned for replica in replicas]
+        assert sum(map(len, owned)) == PARTITIONS, (
+            'Каждую партицию опрашивает ровно одна реплика'
+        )
+        assert set().union(*owned) == set(range(PARTITIONS))
+        assert max(map(len, owned)) <= 3
+
+
+class MockLeases:
+
+    partitions = PARTITIONS
+
+    def __init__(self, owned):
+        self.owned = frozenset(owned)
+
+    def heartbeat(self):
+        return self.owned
+
+
+class TestLeasedTenants:
+
+    def test_filters_by_partition(self):
+        tenants = [Tenant('token', str(number)) for number in range(40)]
+        leases = MockLeases({0, 1})
+        source = LeasedTenants(StaticTenants(tenants), leases)
+        assert {tenant.id for tenant in source.load()} == {
+            tenant.id for tenant in tenants
+            if shard_of(tenant.id, PARTITIONS) in {0, 1}
+        }
+        assert not source.changed()
+        leases.owned = frozenset({2})
+        assert source.changed(), 'Смена партиций - повод перечитать студентов'
+        assert all(shard_of(tenant.id, PARTITIONS) == 2
+                   for tenant in source.load())
+
+    def test_replicas_share_telegram_rate(self, tmp_path):
+        clock = Clock()
+        path = tmp_path / 'state.sqlite3'
+        sender = Sender(MockBot())
+        source = LeasedTenants(
+            StaticTenants([]), make_leases(path, 'a', clock), sender
+        )
+        source.load()
+        assert sender.global_bucket.rate == GLOBAL_RATE
+        make_leases(path, 'b', clock).heartbeat()
+        source.changed()
+        assert sender.global_bucket.rate == GLOBAL_RATE / 2, (
+            'Реплики с общим токеном бота делят лимит Telegram'
+        )
+
+    def test_takeover_redelivers_outbox(self, tmp_path, monkeypatch):
+        requested = []
+
+        def mock_fetch(url, current_timestamp, headers):
+            requested.append(current_timestamp)
+            return {'homeworks': [], 'current_date': 200}
+
+        monkeypatch.setattr(homework, 'fetch_api_answer', mock_fetch)
+        store = Store(tmp_path / 'state.sqlite3')
+        store.save('5', 100, 'approved', messages=[('5', 'вердикт')])
+        tenant = Tenant('token', '5')
+        leases = MockLeases(set())
+        source = LeasedTenants(StaticTenants([tenant]), leases)
+        bot = MockBot()
+        engine = Engine(None, scheduler=Scheduler(idle=60), store=store,
+                        sender=Sender(bot, outbox=store))
+        engine.sync_tenants(source.load())
+
+        async def runner():
+            task = asyncio.create_task(serve(engine, source, 0.05))
+            await asyncio.sleep(0.1)
+            leases.owned = frozenset({shard_of('5', PARTITIONS)})
+            await asyncio.sleep(0.2)
+            engine.stop()
+            await task
+
+        asyncio.run(runner())
+        assert bot.messages == [('5', 'вердикт')], (
+            'Неотправленные уведомления перешедших студентов отправляются'
+        )
+        assert requested == [100], (
+            'Перешедший студент опрашивается с сохранённого курсора'
+        )
+        assert store.outbox() == []
+
+    def test_released_tenant_leaves_send_queue(self, tmp_path):
+        store = Store(tmp_path / 'state.sqlite3')
+        store.save('5', 100, 'approved', messages=[('5', 'вердикт')])
+        bot = MockBot()
+        engine = Engine(None, scheduler=Scheduler(idle=60), store=store,
+                        sender=Sender(bot, outbox=store))
+        engine.sync_tenants([Tenant('token', '5')])
+        engine.redeliver()
+        engine.sync_tenants([])
+        engine.sender.start()
+        engine.sender.stop(timeout=5)
+        assert bot.messages == [], (
+            'Уведомления отпущенного студента отправит его новый владелец'
+        )
+        assert len(store.outbox()) == 1
@@ -0,0 +1,74 @@
+import logging
+
+from logs import RepeatFilter, RotatingFileHandler
+
+
+def make_record(message, level=logging.ERROR):
+    return logging.makeLogRecord(dict(
+        name='root', levelno=level, levelname=logging.getLevelName(level),
+        msg=message
+    ))
+
+
+class MockHandler:
+
+    def __init__(self):
+        self.records = []
+
+    def handle(self, record):
+        self.records.append(record)
+
+
+class TestRepeatFilter:
+
+    def test_repeats_are_suppressed(self):
+        now = [0]
+        repeats = RepeatFilter(interval=60, clock=lambda: now[0])
+        assert repeats.filter(make_record('сбой'))
+        assert not repeats.filter(make_record('сбой')), (
+            'Повтор ошибки в пределах интервала нужно подавить'
+        )
+        assert not repeats.filter(make_record('сбой'))
+        assert repeats.filter(make_record('другой сбой'))
+        assert repeats.filter(make_record('сбой', logging.INFO)), (
+            'Информационные сообщения не подавляются'
+        )
+        now[0] = 60
+        record = make_record('сбой')
+        assert repeats.filter(record)
+        assert record.getMessage() == (
+            'Сообщение повторилось ещё 2 раз: сбой'
+        ), 'После интервала нужно сообщить число подавленных повторов'
+
+    def test_summaries_for_quiet_repeats(self):
+        now = [0]
+        repeats = RepeatFilter(interval=60, clock=lambda: now[0])
+        repeats.handler = MockHandler()
+        repeats.filter(make_record('сбой'))
+        repeats.filter(make_record('сбой'))
+        now[0] = 120
+        repeats.filter(make_record('новая ошибка'))
+        assert [record.getMessage() for record in repeats.handler.records] == [
+            'Сообщение повторилось ещё 1 раз: сбой'
+        ]
+        repeats.filter(make_record('новая ошибка'))
+        assert [record.getMessage() for record in repeats.flush()] == [
+            'Сообщение повторилось ещё 1 раз: новая ошибка'
+        ]
+
+
+class TestRotatingFileHandler:
+
+    def test_rotation_by_size_and_time(self, tmp_path):
+        path = tmp_path / 'bot.log'
+        handler = RotatingFileHandler(
+            str(path), max_bytes=100, backup_count=2, interval=3600
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        for _ in range(3):
+            handler.emit(make_record('x' * 60))
+        assert (tmp_path / 'bot.log.1').exists(), 'Ротация по размеру'
+        handler.rollover_at = 0
+        handler.emit(make_record('y'))
+        assert (tmp_path / 'bot.log.2').exists(), 'Ротация по времени'
+        handler.close()
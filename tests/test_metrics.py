@@ -0,0 +1,73 @@
+from http import HTTPStatus
+import urllib.request
+
+import homework
+import metrics
+import transport
+
+
+class MockResponse:
+
+    status_code = HTTPStatus.INTERNAL_SERVER_ERROR
+    headers = {}
+
+    def json(self):
+        return {}
+
+
+class TestMetrics:
+
+    def test_counter(self):
+        counter = metrics.Counter('test_total', 'Тест.', label='type')
+        counter.inc('a')
+        counter.inc('a', 2)
+        counter.inc('b')
+        assert counter.samples() == [
+            'homework_bot_test_total{type="a"} 3',
+            'homework_bot_test_total{type="b"} 1',
+        ]
+
+    def test_histogram(self):
+        histogram = metrics.Histogram(
+            'test_seconds', 'Тест.', label='stage', buckets=(0.1, 1)
+        )
+        histogram.observe(0.05, 'x')
+        histogram.observe(0.5, 'x')
+        histogram.observe(3, 'x')
+        assert histogram.samples() == [
+            'homework_bot_test_seconds_bucket{stage="x",le="0.1"} 1',
+            'homework_bot_test_seconds_bucket{stage="x",le="1"} 2',
+            'homework_bot_test_seconds_bucket{stage="x",le="+Inf"} 3',
+            'homework_bot_test_seconds_sum{stage="x"} 3.55',
+            'homework_bot_test_seconds_count{stage="x"} 3',
+        ]
+
+    def test_stages_and_errors(self, monkeypatch, api_url):
+        monkeypatch.setattr(
+            transport.SESSION, 'get', lambda **kwargs: MockResponse()
+        )
+        polls = metrics.POLLS.get()
+        errors = metrics.ERRORS.get('unsuitable_status_code')
+        stages = metrics.STAGE_SECONDS.count('get_api_answer')
+        try:
+            homework.get_api_answer(api_url, 0)
+        except RuntimeError:
+            pass
+        assert metrics.POLLS.get() == polls + 1
+        assert metrics.ERRORS.get('unsuitable_status_code') == errors + 1, (
+            'Ошибки должны считаться по типам'
+        )
+        assert metrics.STAGE_SECONDS.count('get_api_answer') == stages + 1
+
+    def test_server(self):
+        server = metrics.start_server(port=0)
+        port = server.server_address[1]
+        try:
+            with urllib.request.urlopen(
+                f'http://127.0.0.1:{port}/metrics'
+            ) as page:
+                text = page.read().decode()
+        finally:
+            server.shutdown()
+        assert '# TYPE homework_bot_stage_seconds histogram' in text
+        assert '# TYPE homework_bot_polls_total counter' in text
@@ -0,0 +1,103 @@
+import asyncio
+import pstats
+import threading
+import tracemalloc
+
+import homework
+from engine import Engine, Tenant
+import profiling
+from profiling import Profiler
+from scheduler import Scheduler
+
+
+def busy_work():
+    return sum(range(1000))
+
+
+class BusyProfile:
+
+    def enable(self):
+        raise ValueError('Another profiling tool is already active')
+
+
+class TestProfiler:
+
+    def test_disabled_by_default(self, tmp_path):
+        profiler = Profiler(window=1, directory=tmp_path)
+        for _ in range(3):
+            profiler.tick()
+        assert not profiler.active
+        assert not tracemalloc.is_tracing(), (
+            'Без запроса профилирование не должно включаться'
+        )
+        assert list(tmp_path.iterdir()) == []
+
+    def test_window_is_dumped(self, tmp_path):
+        profiler = Profiler(window=2, directory=tmp_path)
+        profiler.request()
+        profiler.tick()
+        assert profiler.active and tracemalloc.is_tracing()
+        thread = threading.Thread(target=profiler.call, args=(busy_work,))
+        thread.start()
+        thread.join()
+        profiler.tick()
+        path = profiler.tick()
+        assert not profiler.active and not tracemalloc.is_tracing()
+        assert path is not None, 'По окончании окна профиль сохраняется'
+        functions = {name for _, _, name in
+                     pstats.Stats(path + '.pstats').stats}
+        assert 'busy_work' in functions, (
+            'Профиль должен включать работу в потоках пула'
+        )
+        assert (tmp_path / (path + '.tracemalloc')).exists()
+        assert (tmp_path / (path + '.top.txt')).read_text(encoding='utf-8')
+
+    def test_failed_enable_does_not_fail_call(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(profiling, 'PER_THREAD_PROFILES', True)
+        profiler = Profiler(window=2, directory=tmp_path)
+        monkeypatch.setattr(profiler, '_profile', BusyProfile)
+        assert profiler.call(busy_work) == busy_work(), (
+            'Сбой профилировщика не должен ломать опрос'
+        )
+
+    def test_single_profile_since_312(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(profiling, 'PER_THREAD_PROFILES', False)
+        profiler = Profiler(window=2, directory=tmp_path)
+        profiler.request()
+        profiler.tick()
+        result = []
+        thread = threading.Thread(
+            target=lambda: result.append(profiler.call(busy_work))
+        )
+        thread.start()
+        thread.join()
+        profiler.tick()
+        assert profiler.tick() is not None
+        assert result == [busy_work()]
+        assert len(profiler._profiles) == 1, (
+            'С Python 3.12 на процесс включается один cProfile'
+        )
+
+    def test_engine_profiles_polls(self, tmp_path, monkeypatch):
+        def mock_fetch(url, current_timestamp, headers):
+            busy_work()
+            return {'homeworks': [], 'current_date': current_timestamp}
+
+        monkeypatch.setattr(homework, 'fetch_api_answer', mock_fetch)
+        profiler = Profiler(window=3, directory=tmp_path)
+        profiler.request()
+        engine = Engine(None, scheduler=Scheduler(idle=0.01),
+                        profiler=profiler)
+        engine.add_tenant(Tenant('token', '1'))
+
+        async def runner():
+            task = asyncio.create_task(engine.run())
+            await asyncio.sleep(0.3)
+            engine.stop()
+            await task
+
+        asyncio.run(runner())
+        dumps = list(tmp_path.glob('*.pstats'))
+        assert len(dumps) == 1
+        functions = {name for _, _, name in pstats.Stats(str(dumps[0])).stats}
+        assert 'mock_fetch' in functions
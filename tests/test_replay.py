@@ -0,0 +1,94 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from benchmarks.bench_replay import synthesize
+import homework
+from replay import (Recorder, Trace, VirtualClock, VirtualEventLoop, replay,
+                    trace_id)
+
+HOMEWORK = {'id': 1, 'homework_name': 'hw', 'status': 'approved',
+            'reviewer_comment': 'длинный комментарий'}
+
+
+class TestRecorder:
+
+    def test_compact_trace(self, tmp_path):
+        path = tmp_path / 'trace.jsonl'
+        headers = homework.make_headers('secret')
+        answers = [{'homeworks': [HOMEWORK], 'current_date': 5}, None,
+                   ConnectionError('нет ответа')]
+
+        def fetch(url, current_timestamp, headers):
+            answer = answers.pop(0)
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+
+        recorder = Recorder(path, clock=lambda: 10)
+        recorded = recorder.wrap(fetch)
+        recorded('url', 1, headers)
+        assert recorded('url', 5, headers) is None
+        with pytest.raises(ConnectionError):
+            recorded('url', 5, headers)
+        recorder.close()
+
+        text = path.read_text(encoding='utf-8')
+        assert 'secret' not in text, 'Токен не должен попадать в трассу'
+        records = [json.loads(line) for line in text.splitlines()]
+        tenant = trace_id(headers)
+        assert records == [
+            {'at': 10, 'tenant': tenant, 'from': 1, 'current_date': 5,
+             'homeworks': [{'id': 1, 'homework_name': 'hw',
+                            'status': 'approved'}]},
+            {'at': 10, 'tenant': tenant, 'from': 5},
+            {'at': 10, 'tenant': tenant, 'from': 5, 'error': 'нет ответа'},
+        ], 'В трассе нужны только id, название и статус работ'
+
+
+class TestTrace:
+
+    def test_answer(self):
+        reviewing = dict(HOMEWORK, status='reviewing')
+        trace = Trace([
+            {'at': 100, 'tenant': 't', 'from': 0, 'homeworks': [reviewing]},
+            {'at': 200, 'tenant': 't', 'from': 100, 'error': 'сбой'},
+            {'at': 300, 'tenant': 't', 'from': 100, 'homeworks': [HOMEWORK]},
+            {'at': 400, 'tenant': 't', 'from': 300,
+             'homeworks': [HOMEWORK]},
+        ])
+        assert trace.answer('t', 0, 150) == {
+            'homeworks': [reviewing], 'current_date': 150
+        }
+        with pytest.raises(ConnectionError):
+            trace.answer('t', 150, 250)
+        assert trace.answer('t', 150, 450)['homeworks'] == [HOMEWORK], (
+            'Повтор той же работы в следующих ответах - не новое событие'
+        )
+
+
+class TestVirtualTime:
+
+    def test_sleep_does_not_wait(self):
+        clock = VirtualClock(1_700_000_000)
+        loop = VirtualEventLoop(clock)
+        started = time.perf_counter()
+        try:
+            loop.run_until_complete(asyncio.sleep(7 * 24 * 3600))
+        finally:
+            loop.close()
+        assert time.perf_counter() - started < 1
+        assert clock() >= 1_700_000_000 + 7 * 24 * 3600
+
+    def test_replay(self):
+        trace = Trace(synthesize(tenants=5, days=1, seed=1))
+        started = time.perf_counter()
+        first = replay(trace)
+        assert time.perf_counter() - started < 10, (
+            'Сутки трафика должны воспроизводиться за секунды'
+        )
+        assert first == replay(trace), 'Воспроизведение детерминировано'
+        assert first['messages'] == len(trace.published)
+        assert first['polls'] > first['tenants'] * 24
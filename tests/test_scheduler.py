@@ -0,0 +1,30 @@
+from scheduler import Scheduler
+
+
+class TestScheduler:
+
+    def test_interval_depends_on_status(self):
+        scheduler = Scheduler()
+        assert scheduler.interval('reviewing') < scheduler.interval(None), (
+            'Во время ревью опрос должен быть чаще, чем в простое'
+        )
+        assert scheduler.interval('approved') > scheduler.interval(
+            'rejected'
+        ), 'После принятия работы опрос должен быть реже'
+
+    def test_deadlines_do_not_drift(self):
+        scheduler = Scheduler(intervals={}, idle=100)
+        assert scheduler.next_deadline(1000, now=1007) == 1100, (
+            'Следующий опрос считается от дедлайна, а не от конца запроса'
+        )
+        assert scheduler.next_deadline(1000, now=1250) == 1300, (
+            'Пропущенные опросы не должны накапливаться'
+        )
+
+    def test_backoff_with_jitter(self):
+        low = Scheduler(backoff_base=10, backoff_max=100, rand=lambda: 0)
+        high = Scheduler(backoff_base=10, backoff_max=100, rand=lambda: 1)
+        assert low.next_deadline(0, now=50, failures=1) == 55
+        assert high.next_deadline(0, now=50, failures=1) == 60
+        assert high.backoff(3) == 40
+        assert high.backoff(10) == 100, 'Задержка ограничена сверху'
@@ -0,0 +1,206 @@
+import sqlite3
+import threading
+import time
+
+from botapi import BotError
+import sender as sender_module
+from sender import MESSAGE_LIMIT, Sender, TokenBucket
+
+
+class RetryAfter(Exception):
+
+    def __init__(self, retry_after):
+        super().__init__('Flood control exceeded')
+        self.retry_after = retry_after
+
+
+class MockBot:
+
+    def __init__(self, failures=()):
+        self.messages = []
+        self.failures = list(failures)
+        self.first_sent = threading.Event()
+
+    def send_message(self, chat_id, text):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.messages.append((chat_id, text))
+        self.first_sent.set()
+
+
+class MockOutbox:
+
+    def __init__(self):
+        self.done_ids = []
+
+    def done(self, ids):
+        self.done_ids.extend(ids)
+
+
+class LockedOutbox:
+
+    def done(self, ids):
+        raise sqlite3.OperationalError('database is locked')
+
+
+class SlowBot:
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.messages = []
+        self.active = set()
+        self.overlap = []
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id, text):
+        with self.lock:
+            self.overlap.append(chat_id in self.active)
+            self.active.add(chat_id)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active.discard(chat_id)
+            self.messages.append((chat_id, text))
+
+
+class TestTokenBucket:
+
+    def test_rate(self):
+        now = [0]
+        bucket = TokenBucket(2, clock=lambda: now[0])
+        bucket.consume()
+        bucket.consume()
+        assert bucket.delay() == 0.5, 'Пустое ведро пополняется со скоростью rate'
+        now[0] = 0.5
+        assert bucket.delay() == 0
+
+
+class TestSender:
+
+    def test_coalesces_messages_per_chat(self):
+        bot = MockBot()
+        sender = Sender(bot)
+        sender.submit('1', 'первое')
+        sender.submit('2', 'другой чат')
+        sender.submit('1', 'второе')
+        sender.start()
+        sender.stop(timeout=5)
+        assert sorted(bot.messages) == [
+            ('1', 'первое\n\nвторое'), ('2', 'другой чат')
+        ], 'Сообщения одному чату должны склеиваться в одно'
+
+    def test_long_batches_are_split(self):
+        bot = MockBot()
+        sender = Sender(bot, chat_rate=1000)
+        for _ in range(3):
+            sender.submit('1', 'x' * ((MESSAGE_LIMIT - 2) // 2))
+        sender.start()
+        sender.stop(timeout=5)
+        assert len(bot.messages) == 2
+        assert all(len(text) <= MESSAGE_LIMIT for _, text in bot.messages)
+
+    def test_retry_after(self):
+        bot = MockBot(failures=[RetryAfter(0.05)])
+        sender = Sender(bot)
+        sender.send_message('1', 'текст')
+        sender.start()
+        assert bot.first_sent.wait(5), 'После 429 отправку нужно повторить'
+        sender.stop(timeout=5)
+        assert bot.messages == [('1', 'текст')]
+
+    def test_chats_are_sent_concurrently(self):
+        bot = SlowBot(0.1)
+        sender = Sender(bot, workers=8)
+        sender.submit_many([(str(chat), 'вердикт', None) for chat in range(8)])
+        started = time.monotonic()
+        sender.start()
+        sender.stop(timeout=5)
+        assert len(bot.messages) == 8
+        assert time.monotonic() - started < 0.5, (
+            'Разные чаты должны отправляться параллельно'
+        )
+
+    def test_one_request_per_chat(self):
+        bot = SlowBot(0.05)
+        sender = Sender(bot, chat_rate=1000, workers=4)
+        sender.start()
+        for number in range(3):
+            sender.submit('1', 'x' * (MESSAGE_LIMIT - 1) + str(number))
+            time.sleep(0.01)
+        sender.stop(timeout=5)
+        assert [text[-1] for _, text in bot.messages] == ['0', '1', '2'], (
+            'Сообщения одного чата должны уходить по порядку'
+        )
+        assert not any(bot.overlap), (
+            'В один чат не должно идти два запроса одновременно'
+        )
+
+    def test_outbox_is_kept_while_telegram_fails(self, monkeypatch):
+        monkeypatch.setattr(sender_module, 'SEND_RETRY_DELAY', 0.01)
+        monkeypatch.setattr(sender_module, 'SEND_RETRY_MAX', 0.02)
+        failures = [ConnectionError('нет связи')] * (
+            sender_module.SEND_ATTEMPTS + 2
+        )
+        bot = MockBot(failures=failures)
+        outbox = MockOutbox()
+        sender = Sender(bot, chat_rate=1000, outbox=outbox)
+        sender.submit('1', 'вердикт', 7)
+        sender.start()
+        assert bot.first_sent.wait(5), (
+            'Сообщения из outbox нужно повторять, пока Telegram недоступен'
+        )
+        sender.stop(timeout=5)
+        assert bot.messages == [('1', 'вердикт')]
+        assert outbox.done_ids == [7]
+
+    def test_outbox_is_kept_on_stop(self, monkeypatch):
+        monkeypatch.setattr(sender_module, 'SEND_RETRY_DELAY', 0.01)
+        bot = MockBot(failures=[ConnectionError('нет связи')] * 100)
+        outbox = MockOutbox()
+        sender = Sender(bot, chat_rate=1000, outbox=outbox)
+        sender.submit('1', 'вердикт', 7)
+        sender.start()
+        time.sleep(0.2)
+        sender.stop(timeout=5)
+        assert outbox.done_ids == [], (
+            'Неотправленное сообщение нельзя удалять из outbox'
+        )
+
+    def test_permanent_error_drops_message(self):
+        bot = MockBot(failures=[BotError('chat not found', code=400)])
+        outbox = MockOutbox()
+        sender = Sender(bot, outbox=outbox)
+        sender.submit('1', 'вердикт', 7)
+        sender.start()
+        sender.stop(timeout=5)
+        assert bot.messages == [] and bot.failures == []
+        assert outbox.done_ids == [7], (
+            'После ошибки 4xx сообщение повторять бессмысленно'
+        )
+
+    def test_discarded_messages_stay_in_outbox(self):
+        bot = MockBot()
+        outbox = MockOutbox()
+        sender = Sender(bot, outbox=outbox)
+        sender.submit_many([('1', 'первое', 1), ('1', 'второе', 2),
+                            ('2', 'третье', 3)])
+        sender.discard([1, 3])
+        sender.start()
+        sender.stop(timeout=5)
+        assert bot.messages == [('1', 'второе')], (
+            'Снятые с очереди сообщения отправлять не нужно'
+        )
+        assert outbox.done_ids == [2]
+
+    def test_outbox_error_keeps_worker(self):
+        bot = MockBot()
+        sender = Sender(bot, chat_rate=1000, outbox=LockedOutbox(), workers=1)
+        sender.start()
+        sender.submit('1', 'первое', 1)
+        time.sleep(0.1)
+        sender.submit('1', 'второе', 2)
+        sender.submit('2', 'третье', 3)
+        time.sleep(0.1)
+        sender.stop(timeout=5)
+        assert bot.messages == [
+            ('1', 'первое'), ('1', 'второе'), ('2', 'третье')
+        ], 'Сбой outbox не должен останавливать отправку'
@@ -0,0 +1,218 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import homework
+from engine import Engine, Tenant, load_tenants, restore_tenants
+from scheduler import Scheduler
+from sender import Sender
+from storage import Store
+
+
+class LockedConnection:
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self.connection.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self.connection.__exit__(*exc_info)
+
+    def execute(self, *args):
+        return self.connection.execute(*args)
+
+    def executemany(self, *args):
+        raise sqlite3.OperationalError('database is locked')
+
+
+class TestStore:
+
+    def test_state_survives_restart(self, tmp_path):
+        path = tmp_path / 'state.sqlite3'
+        store = Store(path, flush_interval=3600)
+        store.save('1', 100, None)
+        store.save('2', 200, 'reviewing')
+        store.close()
+
+        restored = Store(path).load()
+        assert restored == {'1': (100, None), '2': (200, 'reviewing')}, (
+            'Проверьте, что при закрытии хранилище записывает все курсоры'
+        )
+
+    def test_batched_and_durable_writes(self, tmp_path):
+        now = [0]
+        path = tmp_path / 'state.sqlite3'
+        store = Store(path, flush_interval=10, clock=lambda: now[0])
+        reader = Store(path)
+
+        store.save('1', 100, None)
+        assert reader.load() == {}, 'Курсоры без вердикта пишутся пачкой'
+        store.save('2', 200, 'approved', durable=True)
+        assert reader.load() == {'1': (100, None), '2': (200, 'approved')}
+        store.save('1', 150, None)
+        now[0] = 10
+        store.save('3', 300, None)
+        assert reader.load()['1'] == (150, None), (
+            'По истечении flush_interval очередь должна записаться'
+        )
+
+    def test_numeric_id_is_restored(self, tmp_path):
+        path = tmp_path / 'tenants.jsonl'
+        path.write_text(
+            '{"token": "a", "chat_id": 1, "id": 42, "current_date": 100}\n',
+            encoding='utf-8'
+        )
+        store = Store(tmp_path / 'state.sqlite3')
+        store.save('42', 500, 'approved', durable=True)
+        tenants = load_tenants(path)
+        restore_tenants(tenants, store)
+        assert tenants[0].id == '42'
+        assert tenants[0].current_date == 500, (
+            'Курсор студента с числовым id должен восстанавливаться'
+        )
+
+    def test_engine_resumes_from_store(self, tmp_path, monkeypatch):
+        requested = []
+
+        def mock_fetch(url, current_timestamp, headers):
+            requested.append(current_timestamp)
+            return {'homeworks': [], 'current_date': current_timestamp + 5}
+
+        monkeypatch.setattr(homework, 'fetch_api_answer', mock_fetch)
+        path = tmp_path / 'state.sqlite3'
+        seed = Store(path)
+        seed.save('1', 1000, 'reviewing')
+        seed.close()
+
+        store = Store(path)
+        tenant = Tenant('token', '1')
+        restore_tenants([tenant], store)
+        engine = Engine(None, scheduler=Scheduler(idle=60), store=store)
+        engine.add_tenant(tenant)
+
+        async def runner():
+            task = asyncio.create_task(engine.run())
+            await asyncio.sleep(0.1)
+            engine.stop()
+            await task
+
+        asyncio.run(runner())
+        assert requested == [1000], 'Опрос должен продолжиться с курсора'
+        assert tenant.status == 'reviewing'
+        assert Store(path).load()['1'] == (1000, 'reviewing'), (
+            'Без смен статусов курсор остаётся на месте'
+        )
+
+
+class MockBot:
+
+    def __init__(self, fail=False):
+        self.messages = []
+        self.fail = fail
+
+    def send_message(self, chat_id, text):
+        if self.fail:
+            raise ConnectionError('Telegram недоступен')
+        self.messages.append((chat_id, text))
+
+
+class TestOutbox:
+
+    def test_failed_save_keeps_other_states(self, tmp_path):
+        path = tmp_path / 'state.sqlite3'
+        store = Store(path, flush_interval=3600)
+        store.save('1', 100, None)
+        connection, store.connection = (
+            store.connection, LockedConnection(store.connection)
+        )
+        with pytest.raises(sqlite3.OperationalError):
+            store.save('2', 200, 'approved', messages=[(2, 'вердикт')])
+        store.connection = connection
+        store.flush()
+        assert Store(path).load() == {'1': (100, None)}, (
+            'Курсор без записанного уведомления сохранять нельзя, '
+            'а курсоры других студентов терять нельзя'
+        )
+
+    def test_cursor_moves_after_save(self, tmp_path, monkeypatch):
+        def mock_fetch(url, current_timestamp, headers):
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': 200
+            }
+
+        monkeypatch.setattr(homework, 'fetch_api_answer', mock_fetch)
+        store = Store(tmp_path / 'state.sqlite3')
+        store.connection = LockedConnection(store.connection)
+        bot = MockBot()
+        engine = Engine(bot, scheduler=Scheduler(idle=60), store=store,
+                        sender=Sender(bot, outbox=store))
+        tenant = Tenant('token', '1', current_date=100)
+        engine.add_tenant(tenant)
+        asyncio.run(engine.poll(tenant))
+
+        assert tenant.current_date == 100 and tenant.status is None, (
+            'Курсор двигается только после сохранения состояния'
+        )
+        assert tenant.index.changed(
+            {'homework_name': 'hw', 'status': 'approved'}
+        ), 'Несохранённая работа должна быть запрошена снова'
+
+    def test_messages_are_written_with_cursor(self, tmp_path):
+        path = tmp_path / 'state.sqlite3'
+        store = Store(path, flush_interval=3600)
+        ids = store.save('1', 100, 'approved', messages=[(1, 'вердикт')])
+        reader = Store(path)
+        assert reader.load() == {'1': (100, 'approved')}, (
+            'Курсор должен записываться вместе с уведомлением'
+        )
+        assert reader.outbox() == [(ids[0], '1', '1', 'вердикт')]
+        store.done(ids)
+        assert reader.outbox() == []
+
+    def test_undelivered_messages_survive_restart(self, tmp_path,
+                                                  monkeypatch):
+        homeworks = [{'id': 1, 'homework_name': 'hw', 'status': 'approved'}]
+        requested = []
+
+        def mock_fetch(url, current_timestamp, headers):
+            requested.append(current_timestamp)
+            return {
+                'homeworks': homeworks if current_timestamp < 200 else [],
+                'current_date': 200
+            }
+
+        monkeypatch.setattr(homework, 'fetch_api_answer', mock_fetch)
+        path = tmp_path / 'state.sqlite3'
+
+        def run_once(bot, tenant):
+            store = Store(path)
+            engine = Engine(
+                None, scheduler=Scheduler(idle=60), store=store,
+                sender=Sender(bot, outbox=store)
+            )
+            engine.sync_tenants([tenant])
+
+            async def runner():
+                task = asyncio.create_task(engine.run())
+                await asyncio.sleep(0.1)
+                engine.stop()
+                await task
+
+            asyncio.run(runner())
+            store.close()
+
+        run_once(MockBot(fail=True), Tenant('token', '1', current_date=100))
+        assert requested == [100]
+        bot = MockBot()
+        run_once(bot, Tenant('token', '1', current_date=100))
+        assert requested == [100, 200], (
+            'Сбой отправки не должен приводить к повторному опросу'
+        )
+        assert bot.messages == [('1', homework.parse_status(homeworks[0]))], (
+            'Неотправленное уведомление нужно доставить после перезапуска'
+        )
+        assert Store(path).outbox() == []
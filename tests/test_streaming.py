@@ -0,0 +1,89 @@
+from http import HTTPStatus
+import json
+
+import pytest
+
+import homework
+import transport
+from streaming import HomeworkStream
+
+HOMEWORKS = [
+    {'id': 2, 'homework_name': 'проект "Бот"', 'status': 'reviewing',
+     'reviewer_comment': 'Смотрю ✓'},
+    {'id': 1, 'homework_name': 'hw1', 'status': 'approved',
+     'reviewer_comment': None},
+]
+BODY = json.dumps(
+    {'homeworks': HOMEWORKS, 'current_date': 1234567890},
+    ensure_ascii=False, indent=1
+).encode()
+
+
+def split(data, size):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+class MockStreamResponse:
+
+    def __init__(self, body, status_code=HTTPStatus.OK):
+        self.body = body
+        self.status_code = status_code
+        self.headers = {}
+
+    def iter_content(self, chunk_size):
+        return iter(split(self.body, 7))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class TestHomeworkStream:
+
+    @pytest.mark.parametrize('size', [1, 2, 5, 64, len(BODY)])
+    def test_chunk_boundaries(self, size):
+        stream = HomeworkStream(split(BODY, size))
+        assert list(stream) == HOMEWORKS, (
+            'Работы должны разбираться при любом разбиении потока, '
+            'в том числе посреди многобайтового символа'
+        )
+        assert stream.fields == {'current_date': 1234567890}
+
+    def test_fields_before_array(self):
+        body = b'{"current_date": 12, "homeworks": [] }'
+        stream = HomeworkStream(split(body, 3))
+        assert list(stream) == []
+        assert stream.fields == {'current_date': 12}
+
+    def test_truncated_body(self):
+        with pytest.raises(ValueError):
+            list(HomeworkStream(split(BODY[:-10], 16)))
+
+
+class TestIterApiAnswer:
+
+    def test_streamed_answer(self, monkeypatch, api_url):
+        def mock_get(url, headers, params, timeout, stream=False):
+            assert stream, 'Ответ должен читаться потоком'
+            return MockStreamResponse(BODY)
+
+        monkeypatch.setattr(transport.SESSION, 'get', mock_get)
+        fields = {}
+        result = list(homework.iter_api_answer(
+            api_url, 0, homework.make_headers('token'), fields
+        ))
+        assert result == HOMEWORKS
+        assert fields == {'current_date': 1234567890}
+
+    def test_streamed_error(self, monkeypatch, api_url):
+        body = b'{"code": "not_authenticated", "message": "..."}'
+        monkeypatch.setattr(
+            transport.SESSION, 'get',
+            lambda **kwargs: MockStreamResponse(body)
+        )
+        with pytest.raises(RuntimeError):
+            list(homework.iter_api_answer(
+                api_url, 0, homework.make_headers('token'), {}
+            ))
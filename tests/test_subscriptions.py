@@ -0,0 +1,88 @@
+import pytest
+
+from engine import Engine, Tenant
+import homework
+from scheduler import Scheduler
+from sender import Sender
+from storage import Store
+from subscriptions import Subscriptions
+from tests.test_engine import MockBot, run_engine_for
+
+HOMEWORK = {'id': 7, 'homework_name': 'hw7', 'status': 'approved'}
+
+
+class TestSubscriptions:
+
+    def test_recipients(self):
+        subscriptions = Subscriptions()
+        subscriptions.add('mentor', tenant='1')
+        subscriptions.add('cohort', tenant='1')
+        subscriptions.add(-100, homework_key=7)
+        subscriptions.add('1', tenant='1')
+        tenant = Tenant('token', '1')
+        assert subscriptions.recipients(tenant, HOMEWORK) == [
+            '1', '-100', 'cohort', 'mentor'
+        ], 'Чат студента первый, подписчики - без повторов'
+        assert subscriptions.recipients(
+            Tenant('token', '2'), {'homework_name': 'hw', 'status': 'approved'}
+        ) == ['2']
+
+    def test_load(self, tmp_path):
+        path = tmp_path / 'subscriptions.jsonl'
+        path.write_text(
+            '{"chat_id": "mentor", "tenant": "1"}\n\n'
+            '{"chat_id": "cohort", "homework": 7}\n',
+            encoding='utf-8'
+        )
+        subscriptions = Subscriptions.load(path)
+        assert subscriptions.recipients(Tenant('token', '1'), HOMEWORK) == [
+            '1', 'cohort', 'mentor'
+        ]
+
+    def test_subscription_needs_target(self):
+        with pytest.raises(ValueError):
+            Subscriptions().add('mentor')
+
+    def test_verdict_rendered_once(self, monkeypatch, tmp_path):
+        rendered = []
+        parse_status = homework.parse_status
+
+        def mock_parse_status(homework_data):
+            rendered.append(homework_data['id'])
+            return parse_status(homework_data)
+
+        monkeypatch.setattr(homework, 'parse_status', mock_parse_status)
+        monkeypatch.setattr(
+            homework, 'fetch_api_answer',
+            lambda url, current_timestamp, headers: {
+                'homeworks': [HOMEWORK], 'current_date': 20
+            }
+        )
+        subscriptions = Subscriptions()
+        subscriptions.add('mentor', tenant='1')
+        subscriptions.add('cohort', homework_key=7)
+        store = Store(tmp_path / 'state.sqlite3', flush_interval=3600)
+        bot = MockBot()
+        saved = []
+        save = store.save
+
+        def mock_save(*args, **kwargs):
+            saved.extend(kwargs.get('messages', ()))
+            return save(*args, **kwargs)
+
+        monkeypatch.setattr(store, 'save', mock_save)
+        engine = Engine(None, scheduler=Scheduler(idle=60), store=store,
+                        sender=Sender(bot, outbox=store),
+                        subscriptions=subscriptions)
+        engine.add_tenant(Tenant('token', '1', current_date=10))
+        run_engine_for(engine, 0.2)
+
+        verdict = parse_status(HOMEWORK)
+        assert rendered == [7], 'Вердикт формируется один раз'
+        assert sorted(bot.messages) == [
+            ('1', verdict), ('cohort', verdict), ('mentor', verdict)
+        ]
+        assert sorted(saved) == sorted(bot.messages), (
+            'Каждому получателю - своя запись outbox'
+        )
+        assert store.outbox() == []
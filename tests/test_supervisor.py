@@ -0,0 +1,142 @@
+import collections
+import os
+
+from engine import Engine, Tenant, TenantsFile, shard_of
+import homework
+from scheduler import Scheduler
+import supervisor
+from supervisor import Supervisor, run_worker
+
+
+def exit_worker(shard, shards):
+    os._exit(3)
+
+
+def replica_worker(shard, shards):
+    import leases
+
+    with open(os.environ['REPLICA_LOG'], 'a', encoding='utf-8') as file:
+        file.write(f'{leases.REPLICA_ID}-w{shard}\n')
+    os._exit(3)
+
+
+class TestSharding:
+
+    def test_shard_is_stable_and_balanced(self):
+        ids = [str(number) for number in range(4000)]
+        shards = collections.Counter(
+            shard_of(tenant_id, 4) for tenant_id in ids
+        )
+        assert sorted(shards) == [0, 1, 2, 3]
+        assert min(shards.values()) > 800, 'Шарды должны быть примерно равны'
+        assert [shard_of(tenant_id, 4) for tenant_id in ids] == [
+            shard_of(tenant_id, 4) for tenant_id in ids
+        ]
+
+    def test_tenants_file(self, tmp_path):
+        path = tmp_path / 'tenants.jsonl'
+        path.write_text(''.join(
+            f'{{"token": "t{number}", "chat_id": "{number}"}}\n'
+            for number in range(20)
+        ), encoding='utf-8')
+        sources = [TenantsFile(path, shard, 3) for shard in range(3)]
+        loaded = [source.load() for source in sources]
+        ids = sorted(int(tenant.id) for tenants in loaded for tenant in tenants)
+        assert ids == list(range(20)), (
+            'Каждый студент должен попасть ровно в один шард'
+        )
+        assert not sources[0].changed()
+        os.utime(path, ns=(0, 0))
+        assert sources[0].changed()
+
+    def test_workers_are_separate_replicas(self, tmp_path, monkeypatch):
+        path = tmp_path / 'tenants.jsonl'
+        path.write_text('{"token": "a", "chat_id": "1"}\n', encoding='utf-8')
+        replicas = []
+        monkeypatch.setattr(homework, 'TENANTS_FILE', str(path))
+        monkeypatch.setattr(homework, 'make_bot', lambda: None)
+        monkeypatch.setattr(supervisor, 'LEASES', True)
+        monkeypatch.setattr(supervisor, 'setup_logging', lambda path: None)
+        monkeypatch.setattr(
+            supervisor, 'run_engine',
+            lambda *args, replica, **kwargs: replicas.append(replica)
+        )
+        for shard in range(2):
+            run_worker(shard, 2)
+        assert len(set(replicas)) == 2, (
+            'Воркеры должны арендовать партиции как разные реплики'
+        )
+
+    def test_sync_tenants(self):
+        engine = Engine(None, scheduler=Scheduler(idle=60))
+        engine.sync_tenants([Tenant('a', '1'), Tenant('b', '2')])
+        kept = engine.tenants['2']
+        assert engine.sync_tenants([Tenant('b', '2'), Tenant('c', '3')]) == (
+            1, 1
+        )
+        assert sorted(engine.tenants) == ['2', '3']
+        assert engine.tenants['2'] is kept, (
+            'Оставшийся студент не должен терять состояние'
+        )
+
+
+class TestSupervisor:
+
+    def test_crashed_worker_is_restarted(self):
+        supervisor = Supervisor(workers=2, target=exit_worker, restart_delay=0)
+        supervisor.start()
+        try:
+            first = [process.pid for process in supervisor.processes]
+            for process in supervisor.processes:
+                process.join(30)
+            assert [process.exitcode for process in supervisor.processes] == [
+                3, 3
+            ]
+            supervisor.check()
+            second = [process.pid for process in supervisor.processes]
+            assert all(old != new for old, new in zip(first, second)), (
+                'Упавшие воркеры нужно перезапускать'
+            )
+        finally:
+            supervisor.stop()
+
+    def test_restarted_worker_keeps_replica(self, tmp_path, monkeypatch):
+        log = tmp_path / 'replicas.txt'
+        monkeypatch.setenv('REPLICA_LOG', str(log))
+        monkeypatch.setenv('REPLICA_ID', '')
+        monkeypatch.delenv('REPLICA_ID')
+        runner = Supervisor(
+            workers=1, target=replica_worker, restart_delay=0
+        )
+        runner.start()
+        try:
+            runner.processes[0].join(30)
+            runner.check()
+            runner.processes[0].join(30)
+        finally:
+            runner.stop()
+        first, second = log.read_text(encoding='utf-8').split()
+        assert first == second == f'{supervisor.REPLICA_ID}-w0', (
+            'Перезапущенный воркер должен вернуться той же репликой'
+        )
+
+    def test_restart_is_throttled(self):
+        now = [0]
+        supervisor = Supervisor(
+            workers=1, target=exit_worker, restart_delay=10,
+            clock=lambda: now[0]
+        )
+        supervisor.start()
+        try:
+            process = supervisor.processes[0]
+            process.join(30)
+            supervisor.check()
+            assert supervisor.processes[0] is process, (
+                'Воркер, падающий сразу после старта, перезапускается '
+                'не чаще раза в restart_delay'
+            )
+            now[0] = 10
+            supervisor.check()
+            assert supervisor.processes[0] is not process
+        finally:
+            supervisor.stop()
@@ -0,0 +1,263 @@
+import asyncio
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+
+import pytest
+
+import botapi
+from engine import Engine, Tenant
+import homework
+import metrics
+from scheduler import Scheduler
+import transport
+
+
+class DripHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    body = b'{"ok": true, "result": {}, "homeworks": [], "current_date": 1}'
+    delay = 0.2
+
+    def reply(self):
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        try:
+            for position in range(0, len(self.body), 8):
+                self.wfile.write(self.body[position:position + 8])
+                self.wfile.flush()
+                time.sleep(self.delay)
+        except OSError:
+            pass
+
+    do_GET = do_POST = reply
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def drip_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), DripHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/'
+    server.shutdown()
+    server.server_close()
+
+
+class MockResponse:
+
+    def __init__(self, status_code=HTTPStatus.OK, headers=None, data=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.data = data
+
+    def json(self):
+        assert self.status_code != HTTPStatus.NOT_MODIFIED, (
+            'Ответ 304 не должен разбираться'
+        )
+        return self.data
+
+
+class TestTransport:
+
+    def test_session_pool(self):
+        session = transport.make_session(pool_size=7)
+        adapter = session.get_adapter('https://practicum.yandex.ru/')
+        assert adapter._pool_maxsize == 7, (
+            'Проверьте, что размер пула соединений настраивается'
+        )
+        assert 'gzip' in session.headers['Accept-Encoding']
+
+    def test_conditional_request(self, monkeypatch, api_url):
+        sent = []
+        responses = [
+            MockResponse(
+                headers={'ETag': '"v1"', 'Last-Modified': 'Mon'},
+                data={'homeworks': [], 'current_date': 1}
+            ),
+            MockResponse(status_code=HTTPStatus.NOT_MODIFIED),
+        ]
+
+        def mock_get(url, headers, params, timeout):
+            assert timeout == (
+                transport.CONNECT_TIMEOUT, transport.READ_TIMEOUT
+            ), 'У каждого запроса должен быть таймаут'
+            sent.append(headers)
+            return responses.pop(0)
+
+        monkeypatch.setattr(transport, 'CACHE', transport.ConditionalCache())
+        monkeypatch.setattr(transport.SESSION, 'get', mock_get)
+        headers = homework.make_headers('token')
+
+        first = homework.fetch_api_answer(api_url, 0, headers)
+        second = homework.fetch_api_answer(api_url, 0, headers)
+
+        assert first == {'homeworks': [], 'current_date': 1}
+        assert 'If-None-Match' not in sent[0]
+        assert sent[1]['If-None-Match'] == '"v1"'
+        assert sent[1]['If-Modified-Since'] == 'Mon'
+        assert second is None, (
+            'Неизменившийся ответ должен пропускаться без разбора'
+        )
+
+    def test_validators_are_per_token(self, api_url):
+        cache = transport.ConditionalCache()
+        cache.remember(
+            api_url, homework.make_headers('a'), {'from_date': 0},
+            MockResponse(headers={'ETag': '"a"'})
+        )
+        assert cache.headers(
+            api_url, homework.make_headers('b'), {'from_date': 0}
+        ) == {}
+
+    def test_validators_are_per_query(self, api_url):
+        cache = transport.ConditionalCache()
+        headers = homework.make_headers('a')
+        cache.remember(api_url, headers, {'from_date': 100},
+                       MockResponse(headers={'Last-Modified': 'Mon'}))
+        assert cache.headers(api_url, headers, {'from_date': 0}) == {}, (
+            'Валидаторы одного from_date нельзя слать с другим'
+        )
+        assert cache.headers(api_url, headers, {'from_date': 100}) == {
+            'If-Modified-Since': 'Mon'
+        }
+        cache.forget(api_url, headers, {'from_date': 100})
+        assert cache.headers(api_url, headers, {'from_date': 100}) == {}
+
+
+class TestConditionalPolls:
+
+    def test_engine_polls_are_conditional(self, api_url, monkeypatch):
+        sent = []
+
+        def mock_get(url, headers, params, timeout):
+            sent.append((params['from_date'], headers))
+            if headers.get('If-None-Match') == '"v1"':
+                return MockResponse(status_code=HTTPStatus.NOT_MODIFIED)
+            return MockResponse(
+                headers={'ETag': '"v1"'},
+                data={'homeworks': [], 'current_date': 200}
+            )
+
+        cache = transport.ConditionalCache()
+        monkeypatch.setattr(transport, 'CACHE', cache)
+        monkeypatch.setattr(transport.SESSION, 'get', mock_get)
+        engine = Engine(None, api_url, scheduler=Scheduler(idle=60))
+        tenant = Tenant('token', '1', current_date=100)
+        for _ in range(3):
+            asyncio.run(engine.poll(tenant))
+
+        assert [from_date for from_date, _ in sent] == [100, 100, 100]
+        assert 'If-None-Match' not in sent[0][1]
+        assert all(headers.get('If-None-Match') == '"v1"'
+                   for _, headers in sent[1:]), (
+            'Повторный опрос без изменений должен быть условным'
+        )
+        assert tenant.failures == 0
+        assert len(cache._validators) == 1, (
+            'На студента хранится одна запись валидаторов'
+        )
+
+
+class MockHedgedResponse:
+
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestDeadline:
+
+    def test_timeouts_follow_budget(self):
+        assert transport.remaining() is None
+        with transport.deadline(1):
+            connect, read = transport.timeout()
+            assert 0 < connect <= 1 and 0 < read <= 1, (
+                'Таймауты запроса не должны выходить за бюджет цикла'
+            )
+            with transport.deadline(100):
+                assert transport.remaining() <= 1, (
+                    'Вложенный бюджет не продлевает внешний'
+                )
+        assert transport.timeout() == (
+            transport.CONNECT_TIMEOUT, transport.READ_TIMEOUT
+        )
+
+    def test_exhausted_budget(self):
+        with transport.deadline(0):
+            with pytest.raises(transport.DeadlineExceeded):
+                transport.timeout()
+        chunks = transport.bounded(iter([b'a', b'b']))
+        with transport.deadline(0.05):
+            assert next(chunks) == b'a'
+            time.sleep(0.06)
+            with pytest.raises(transport.DeadlineExceeded):
+                next(chunks)
+
+
+    def test_slow_body_is_cut_at_deadline(self, drip_url):
+        started = time.monotonic()
+        with pytest.raises(ConnectionError):
+            transport.within(0.5, homework.fetch_api_answer, drip_url, 0, {})
+        assert time.monotonic() - started < 1, (
+            'Тело ответа нужно дочитывать в пределах бюджета цикла'
+        )
+        answer = transport.within(
+            10, homework.fetch_api_answer, drip_url, 0, {}
+        )
+        assert answer['current_date'] == 1
+
+    def test_slow_bot_reply_is_cut_at_deadline(self, drip_url):
+        bot = botapi.Bot('token', base_url=drip_url)
+        started = time.monotonic()
+        with pytest.raises(transport.DeadlineExceeded):
+            transport.within(0.5, bot.send_message, 1, 'текст')
+        assert time.monotonic() - started < 1
+
+
+class TestHedger:
+
+    def test_slow_request_is_hedged(self):
+        release = threading.Event()
+        responses = []
+
+        def request(timeout):
+            response = MockHedgedResponse(len(responses))
+            responses.append(response)
+            if response.name == 0:
+                release.wait(5)
+            return response
+
+        hedger = transport.Hedger(workers=2, min_samples=1, min_delay=0.01)
+        hedger._latencies.append(0.01)
+        hedges = metrics.HEDGES.get()
+        assert hedger.run(request).name == 1, (
+            'Побеждает первый пришедший ответ'
+        )
+        assert metrics.HEDGES.get() == hedges + 1
+        release.set()
+        for _ in range(100):
+            if responses[0].closed:
+                break
+            time.sleep(0.01)
+        assert responses[0].closed, 'Опоздавший ответ нужно закрыть'
+
+    def test_no_hedge_without_history(self):
+        calls = []
+
+        def request(timeout):
+            calls.append(timeout)
+            return MockHedgedResponse(0)
+
+        hedger = transport.Hedger(workers=2)
+        assert hedger.delay() is None
+        with transport.deadline(3):
+            hedger.run(request)
+        assert len(calls) == 1
+        assert calls[0][1] <= 3, 'Бюджет передаётся в поток запроса'
@@ -0,0 +1,370 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+import functools
+import heapq
+import itertools
+import json
+import os
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from breaker import Breakers
+import codec
+import metrics
+
+POOL_SIZE = int(os.getenv('POOL_SIZE', 64))
+POOL_HOSTS = 4
+ACCEPT_ENCODING = 'gzip, deflate'
+CONNECT_TIMEOUT = float(os.getenv('CONNECT_TIMEOUT', 5))
+READ_TIMEOUT = float(os.getenv('READ_TIMEOUT', 15))
+POLL_BUDGET = float(os.getenv('POLL_BUDGET', 30))
+HEDGE = os.getenv('HEDGE', '') == '1'
+HEDGE_QUANTILE = 0.95
+HEDGE_WINDOW = 256
+HEDGE_MIN_SAMPLES = 32
+HEDGE_MIN_DELAY = 0.05
+HEDGE_WORKERS = int(os.getenv('HEDGE_WORKERS', 2 * POOL_SIZE))
+
+DEADLINE_EXCEEDED = 'Бюджет времени на запрос исчерпан'
+
+JSONDecodeError = getattr(
+    requests.exceptions, 'JSONDecodeError', json.JSONDecodeError
+)
+
+_local = threading.local()
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """Запрос не отправлен или прерван: бюджет времени исчерпан."""
+
+
+def decode_json(response, **kwargs):
+    """Разбирает тело ответа декодером codec.loads.
+
+    Ошибка разбора та же, что у Response.json установленной версии
+    requests.
+    """
+    if kwargs:
+        return requests.Response.json(response, **kwargs)
+    try:
+        return codec.loads(response.content)
+    except ValueError as error:
+        if isinstance(error, json.JSONDecodeError):
+            args = error.msg, error.doc, error.pos
+        else:
+            args = str(error), '', 0
+        raise JSONDecodeError(*args) from error
+
+
+def use_codec(response, *args, **kwargs):
+    """Хук ответа: response.json() разбирает тело через decode_json."""
+    response.json = functools.partial(decode_json, response)
+    return response
+
+
+class Watchdog:
+    """Обрывает соединения, тело ответа которых не пришло до дедлайна.
+
+    Таймаут чтения ограничивает одно ожидание сокета, а не всё тело:
+    ответ, приходящий по байту, читался бы сколь угодно долго. Один
+    поток закрывает на чтение сокеты просроченных ответов, и чтение
+    тела сразу завершается ошибкой.
+    """
+
+    def __init__(self):
+        """Создаёт сторожа; поток запускается при первой регистрации."""
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    @staticmethod
+    def _socket(response):
+        try:
+            return response.raw._fp.fp.raw._sock
+        except AttributeError:
+            return None
+
+    def watch(self, response, at):
+        """Регистрирует ответ, тело которого нужно прочитать до at."""
+        sock = self._socket(response)
+        if sock is None:
+            return None
+        entry = [at, next(self._counter), sock, False]
+        with self._condition:
+            heapq.heappush(self._heap, entry)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return entry
+
+    def cancel(self, entry):
+        """Снимает ответ с наблюдения; True, если соединение уже оборвано."""
+        with self._condition:
+            fired = entry[3]
+            entry[2] = None
+        return fired
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._heap and self._heap[0][2] is None:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                entry = heapq.heappop(self._heap)
+                try:
+                    socket.socket.shutdown(entry[2], socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                entry[2], entry[3] = None, True
+
+
+def watch_body(response, *args, stream=False, **kwargs):
+    """Хук ответа: тело без stream=True читается в пределах бюджета потока."""
+    at = getattr(_local, 'deadline', None)
+    if at is not None and not stream:
+        entry = WATCHDOG.watch(response, at)
+        if entry is not None:
+            _local.watched = [*getattr(_local, 'watched', ()), entry]
+    return response
+
+
+def guarded(send, *args, **kwargs):
+    """Выполняет send(*args, **kwargs); тело читается не дольше бюджета.
+
+    Если сторож оборвал соединение, вызывается DeadlineExceeded.
+    """
+    _local.watched = []
+    try:
+        response = send(*args, **kwargs)
+    except Exception as error:
+        if _expired():
+            raise DeadlineExceeded(DEADLINE_EXCEEDED) from error
+        raise
+    if _expired():
+        response.close()
+        raise DeadlineExceeded(DEADLINE_EXCEEDED)
+    return response
+
+
+def _expired():
+    watched, _local.watched = getattr(_local, 'watched', ()), []
+    return any([WATCHDOG.cancel(entry) for entry in watched])
+
+
+def make_session(pool_size=POOL_SIZE):
+    """Создаёт сессию с пулом keep-alive соединений и сжатием ответов.
+
+    Сжатие gzip и deflate согласуется заголовком Accept-Encoding, ответы
+    разбираются быстрым декодером JSON из codec, а тело ответа
+    читается под присмотром сторожа бюджета (Watchdog).
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+    session.headers['Connection'] = 'keep-alive'
+    session.hooks['response'].append(use_codec)
+    session.hooks['response'].append(watch_body)
+    return session
+
+
+@contextmanager
+def deadline(seconds):
+    """Ограничивает запросы этого потока внутри блока seconds секундами.
+
+    Вложенный бюджет не может продлить внешний.
+    """
+    outer = getattr(_local, 'deadline', None)
+    inner = time.monotonic() + seconds
+    _local.deadline = inner if outer is None else min(outer, inner)
+    try:
+        yield
+    finally:
+        _local.deadline = outer
+
+
+def within(seconds, func, *args):
+    """Вызывает func с бюджетом времени seconds на все её запросы."""
+    with deadline(seconds):
+        return func(*args)
+
+
+def remaining():
+    """Возвращает остаток бюджета потока или None, если бюджета нет."""
+    current = getattr(_local, 'deadline', None)
+    if current is None:
+        return None
+    left = current - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded(DEADLINE_EXCEEDED)
+    return left
+
+
+def timeout():
+    """Возвращает таймауты (connect, read) в пределах бюджета потока."""
+    left = remaining()
+    if left is None:
+        return CONNECT_TIMEOUT, READ_TIMEOUT
+    return min(CONNECT_TIMEOUT, left), min(READ_TIMEOUT, left)
+
+
+def bounded(chunks):
+    """Отдаёт куски ответа, пока не исчерпан бюджет потока."""
+    for chunk in chunks:
+        remaining()
+        yield chunk
+
+
+class ConditionalCache:
+    """Хранит ETag и Last-Modified последних ответов.
+
+    На адрес и токен хранится одна запись с параметрами запроса, к
+    которому относятся валидаторы: ответ на один from_date не
+    подставляется в запрос с другим, а память не растёт с числом опросов.
+    """
+
+    def __init__(self):
+        """Создаёт пустой кэш валидаторов."""
+        self._validators = {}
+
+    @staticmethod
+    def _key(url, headers):
+        return url, headers.get('Authorization')
+
+    @staticmethod
+    def _query(params):
+        return tuple(sorted((params or {}).items()))
+
+    def headers(self, url, headers, params):
+        """Возвращает заголовки условного запроса."""
+        query, etag, last_modified = self._validators.get(
+            self._key(url, headers), (None, None, None)
+        )
+        conditional = {}
+        if query != self._query(params):
+            return conditional
+        if etag is not None:
+            conditional['If-None-Match'] = etag
+        if last_modified is not None:
+            conditional['If-Modified-Since'] = last_modified
+        return conditional
+
+    def remember(self, url, headers, params, response):
+        """Запоминает валидаторы успешного ответа."""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        key = self._key(url, headers)
+        if etag is None and last_modified is None:
+            self._validators.pop(key, None)
+        else:
+            self._validators[key] = (self._query(params), etag, last_modified)
+
+    def forget(self, url, headers, params):
+        """Забывает валидаторы запроса: следующий будет безусловным."""
+        key = self._key(url, headers)
+        entry = self._validators.get(key)
+        if entry is not None and entry[0] == self._query(params):
+            self._validators.pop(key, None)
+
+
+def _discard(future):
+    if future.exception() is None:
+        future.result().close()
+
+
+class Hedger:
+    """Дублирует медленные GET-запросы.
+
+    Если ответа нет дольше p95 недавних запросов, отправляется второй
+    такой же запрос; побеждает первый успешный ответ, проигравший
+    закрывается.
+    """
+
+    def __init__(self, workers=HEDGE_WORKERS, quantile=HEDGE_QUANTILE,
+                 window=HEDGE_WINDOW, min_samples=HEDGE_MIN_SAMPLES,
+                 min_delay=HEDGE_MIN_DELAY):
+        """Создаёт пул потоков для основных и дублирующих запросов."""
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._latencies = deque(maxlen=window)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def delay(self):
+        """Возвращает задержку дубля или None, пока мало замеров."""
+        latencies = sorted(self._latencies)
+        if len(latencies) < self.min_samples:
+            return None
+        position = min(len(latencies) - 1,
+                       int(self.quantile * len(latencies)))
+        return max(self.min_delay, latencies[position])
+
+    def _attempt(self, budget, request):
+        started = time.monotonic()
+        _local.deadline = budget
+        try:
+            response = request(timeout=timeout())
+        finally:
+            _local.deadline = None
+        self._latencies.append(time.monotonic() - started)
+        return response
+
+    def run(self, request):
+        """Выполняет request(timeout=...) с дублем, если он медленный."""
+        budget = getattr(_local, 'deadline', None)
+        attempts = {self._executor.submit(self._attempt, budget, request)}
+        delay = self.delay()
+        if delay is not None and not wait(attempts, timeout=delay).done:
+            metrics.HEDGES.inc()
+            attempts.add(self._executor.submit(self._attempt, budget, request))
+        while attempts:
+            done, attempts = wait(attempts, return_when=FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is not None:
+                    error = attempt.exception()
+                    continue
+                for loser in attempts:
+                    loser.add_done_callback(_discard)
+                return attempt.result()
+        raise error
+
+
+WATCHDOG = Watchdog()
+SESSION = make_session()
+CACHE = ConditionalCache()
+BREAKERS = Breakers()
+HEDGER = Hedger() if HEDGE else None
+
+
+def get(url, headers, params, **kwargs):
+    """Выполняет условный GET-запрос через общую сессию и предохранитель.
+
+    Таймауты берутся из бюджета потока, а тело ответа дочитывается до
+    его исчерпания; при HEDGE=1 медленный запрос дублируется.
+    """
+    request = functools.partial(
+        BREAKERS.get(url).call,
+        guarded,
+        SESSION.get,
+        url=url,
+        headers={**headers, **CACHE.headers(url, headers, params)},
+        params=params,
+        **kwargs
+    )
+    if HEDGER is None:
+        return request(timeout=timeout())
+    return HEDGER.run(request)